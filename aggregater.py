@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+# Månedlig rollup: antal ydelser pr. (måned, ydelseskode, bruger). Graferne
+# arbejder kun på denne tabel, så den kan komme fra rækkedata eller direkte
+# fra historik-databasen uden at rækkerne indlæses.
+
+ROLLUP_KOLONNER = ['Måned', 'Ydelseskode', 'Bruger', 'Antal ydelser']
+
+
+# Absolut månedsindeks (år * 12 + måned - 1) for en dato
+def month_index(date):
+    return date.year * 12 + date.month - 1
+
+
+# Absolut månedsindeks for en hel datokolonne
+def month_indices(dates):
+    months = np.asarray(dates, dtype='datetime64[M]').astype('int64')
+    return months + 1970 * 12
+
+
+# Funktion til at lave månedlig rollup af rækkedata
+def monthly_rollup(df):
+    rollup = (
+        pd.DataFrame({
+            'Måned': month_indices(df['Ydelses dato']),
+            'Ydelseskode': df['Ydelseskode'].to_numpy(),
+            'Bruger': np.asarray(df['Bruger'], dtype=object),
+        })
+        .groupby(['Måned', 'Ydelseskode', 'Bruger'], observed=True)
+        .size()
+        .rename('Antal ydelser')
+        .reset_index()
+    )
+    return rollup[ROLLUP_KOLONNER]
+
+
+# Funktion til at udsnitte en periode af rollup'en med Måned_nr (1, 2, 3, ...)
+def period_rollup(rollup, start_date, duration_months):
+    start = month_index(start_date)
+    period = rollup[(rollup['Måned'] >= start) & (rollup['Måned'] < start + duration_months)].copy()
+    period['Måned_nr'] = period['Måned'] - start + 1
+    return period
+
+
+# År der findes data for i en rollup
+def available_years(rollup):
+    return sorted(int(y) for y in np.unique(rollup['Måned'].to_numpy() // 12))
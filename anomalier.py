@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+# Afvigelser i daglige antal for alle koder på én gang: der bygges én
+# (kode x dag) matrix, og basislinje og z-score beregnes med 2-D array-operationer.
+# Basislinjen er samme ugedag de foregående uger, så weekender og faste
+# ugedagsmønstre ikke giver falske alarmer.
+
+BASELINE_WEEKS = 8
+THRESHOLD = 3.0
+MIN_BASELINE = 5.0
+
+
+# Funktion til at bygge (kode x dag) matrix fra dage (siden 1970-01-01), koder og evt. vægte
+def daily_code_matrix(days, codes, weights=None):
+    days = np.asarray(days, dtype=np.int64)
+    if len(days) == 0:
+        return np.array([], dtype=np.int64), 0, np.zeros((0, 0))
+
+    unique_codes, code_idx = np.unique(np.asarray(codes), return_inverse=True)
+    first_day = int(days.min())
+    n_days = int(days.max()) - first_day + 1
+
+    matrix = np.bincount(
+        code_idx * n_days + (days - first_day),
+        weights=weights,
+        minlength=len(unique_codes) * n_days,
+    ).reshape(len(unique_codes), n_days)
+
+    return unique_codes, first_day, matrix
+
+
+# Funktion til at bygge matrixen direkte fra rækkedata
+def rows_daily_matrix(df):
+    days = np.asarray(df['Ydelses dato'], dtype='datetime64[D]').astype(np.int64)
+    return daily_code_matrix(days, df['Ydelseskode'].to_numpy())
+
+
+# Funktion til at finde afvigelser for alle koder og dage på én gang
+def scan_anomalies(codes, first_day, matrix, threshold=THRESHOLD, weeks=BASELINE_WEEKS, min_baseline=MIN_BASELINE):
+    x = np.asarray(matrix, dtype=np.float64)
+    n_codes = x.shape[0]
+    mean = np.full(x.shape, np.nan)
+    var = np.full(x.shape, np.nan)
+
+    # Rullende middel/varians over samme ugedag de foregående uger via kumulerede summer
+    for weekday in range(7):
+        same_day = x[:, weekday::7]
+        if same_day.shape[1] <= weeks:
+            continue
+        zeros = np.zeros((n_codes, 1))
+        c1 = np.concatenate([zeros, np.cumsum(same_day, axis=1)], axis=1)
+        c2 = np.concatenate([zeros, np.cumsum(same_day ** 2, axis=1)], axis=1)
+        j = np.arange(weeks, same_day.shape[1])
+        m = (c1[:, j] - c1[:, j - weeks]) / weeks
+        mean[:, weekday::7][:, weeks:] = m
+        var[:, weekday::7][:, weeks:] = (c2[:, j] - c2[:, j - weeks]) / weeks - m ** 2
+
+    # Standardafvigelsen er mindst sqrt(middel) (Poisson), så små tal ikke giver kæmpe z-scores
+    with np.errstate(invalid='ignore'):
+        std = np.maximum(np.sqrt(np.maximum(var, 0)), np.sqrt(np.maximum(mean, 1)))
+        z = (x - mean) / std
+        # Fald kræver en basislinje af en vis størrelse, udbrud et vist antal på dagen
+        flagged = (np.abs(z) >= threshold) & (np.maximum(mean, x) >= min_baseline)
+
+    code_idx, day_idx = np.nonzero(flagged)
+    return pd.DataFrame({
+        'Dato': (np.datetime64('1970-01-01', 'D') + (first_day + day_idx)).astype('datetime64[ns]'),
+        'Ydelseskode': codes[code_idx],
+        'Antal': x[code_idx, day_idx].astype(np.int64),
+        'Forventet': np.round(mean[code_idx, day_idx], 1),
+        'z': np.round(z[code_idx, day_idx], 1),
+    })
@@ -1,45 +1,387 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
-import io
-from PIL import Image
-import base64
+import os
+import time
+import hashlib
+
+from indlaesning import load_export, load_preview, start_background_load
+from kolonnelager import sync_export_folder, open_column_store, open_quarantine, open_bitmap_index
+from validering import summarize_quarantine
+from aggregater import monthly_rollup, period_rollup, available_years
+from historik import thread_connection, import_export, query_period_rollup, query_rows, total_services, history_version
+from historik import query_code_rollup, query_daily_code_counts, query_monthly_rollup
+from kodekatalog import KODEHIERARKI, aggregate_hierarchy, children, node_label
+from kodematrix import code_month_matrix, year_over_year, top_codes
+from anomalier import daily_code_matrix, rows_daily_matrix, scan_anomalies
+from saeson import UGEDAGE, UGER, season_matrix, group_daily
+from filtre import predicate_bits, predicates, evaluate
+from bitmapindeks import build_bitmap_index, popcount, to_mask
+from diagrammer import GRAFER, MÅNEDER_KORT, chart_aggregates, chart_labels, build_chart, chart_fingerprint, daily_chart
+from nedsampling import PIXEL_BREDDE
+from rendering import RENDER_ARBEJDERE, start_render_pool, iter_rendered
+from pdfrapport import RAPPORT_VERSION, KVALITETER, STANDARD_KVALITET, render_options, vector_pages, report_header, write_report
+from rapportcache import report_cache_dir, cache_file, cache_writer, cache_put
+from eksport import HAR_PYARROW, export_tables, write_excel, write_arrow_zip
+from htmlrapport import summary_table, write_html_report
+from rapportjobs import start_report_queue, submit_report, queue_position
+from concurrent.futures.process import BrokenProcessPool
+from historik import available_years as history_years
 
 # Konfiguration af siden
 st.set_page_config(page_title="Ydelsesanalyse", layout="wide")
 
 st.title("📊 Ydelsesanalyse - Periodesammenligning")
 
-# File upload
-uploaded_file = st.file_uploader("Upload dit datasæt (Excel-fil)", type=['xlsx', 'xls'])
+# Lokal mappe med eksporter (valgfri) - konverteres én gang til kolonnelager
+data_dir = os.environ.get("YDELSER_DATAMAPPE")
+store_root = os.environ.get("YDELSER_LAGERMAPPE")
+
+# Antal rækker i hurtig forhåndsvisning
+PREVIEW_ROWS = 20_000
+
+# Historik-database (SQLite) med al praksishistorik (valgfri)
+history_path = os.environ.get("YDELSER_HISTORIK")
+
+# Delt hukommelse mellem flere Streamlit-processer (valgfri)
+use_shared_memory = os.environ.get("YDELSER_DELT_HUKOMMELSE") == "1"
+
+
+@st.cache_resource(show_spinner=False)
+def get_column_store(store_dir):
+    # Delt på tværs af sessioner - lageret er memory-mapped og read-only
+    return open_column_store(store_dir), open_quarantine(store_dir)
+
+
+def get_history(path):
+    # Én forbindelse pr. tråd - sessioner og rapportkøens tråde deler ikke forbindelse
+    return thread_connection(path)
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def get_rollup(dataset_key, _df):
+    # Månedlig rollup beregnes én gang pr. datasæt
+    return monthly_rollup(_df)
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def get_hierarchy_aggregates(dataset_key, start_date, duration_months, _df_p1, _df_p2):
+    # Alle niveauer i kodehierarkiet beregnes én gang pr. periodevalg
+    return aggregate_hierarchy([_df_p1, _df_p2], duration_months)
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def get_code_matrix(dataset_key, _rollup, _conn):
+    # Hele kode x måned-matrixen beregnes én gang pr. datasæt - historikkens rollup
+    # hentes også kun her, så forespørgslen ikke køres ved hver interaktion
+    if _conn is not None:
+        return code_month_matrix(query_code_rollup(_conn))
+    return code_month_matrix(_rollup)
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def get_daily_matrix(dataset_key, _df, _conn):
+    # (kode x dag) matrix bygges én gang pr. datasæt og deles af afvigelser og sæsonmønster
+    if _conn is not None:
+        return daily_code_matrix(*query_daily_code_counts(_conn))
+    return rows_daily_matrix(_df)
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def get_anomalies(dataset_key, threshold, _daily):
+    # Alle koder scannes samlet
+    codes, first_day, matrix = _daily
+    return scan_anomalies(codes, first_day, matrix, threshold=threshold)
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def get_daily_groups(dataset_key, _daily):
+    # Dagsserier for hver kodegruppe over hele datasættet
+    codes, first_day, matrix = _daily
+    groups = [[code for subgroup in subgroups.values() for code in subgroup] for subgroups in KODEHIERARKI.values()]
+    dates = np.datetime64('1970-01-01', 'D') + first_day + np.arange(matrix.shape[1])
+    return dates, group_daily(codes, matrix, groups)
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def get_season_matrix(dataset_key, start_date_p1, start_date_p2, end_date_p1, end_date_p2, _daily):
+    codes, first_day, matrix = _daily
+    epoch = datetime(1970, 1, 1)
+    periods = [((start_date_p1 - epoch).days, (end_date_p1 - epoch).days),
+               ((start_date_p2 - epoch).days, (end_date_p2 - epoch).days)]
+    groups = [[code for subgroup in subgroups.values() for code in subgroup] for subgroups in KODEHIERARKI.values()]
+    return season_matrix(codes, first_day, matrix, groups, periods)
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def get_bitmap_index(dataset_key, _df, store_dir=None):
+    # Lokal mappe: indekset er bygget ved konverteringen og åbnes memory-mapped
+    index = open_bitmap_index(store_dir) if store_dir else None
+    return index if index is not None else build_bitmap_index(_df)
+
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def get_predicate_bits(dataset_key, predicate, _df, _index):
+    # Hver filterbetingelse har sit eget bitsæt - en ændret betingelse genberegner kun sit eget
+    return predicate_bits(_df, predicate, _index)
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def get_filtered(dataset_key, expression, _df, _index):
+    bits = evaluate(expression, lambda predicate: get_predicate_bits(dataset_key, predicate, _df, _index), len(_df))
+    if popcount(bits) == len(_df):
+        return _df
+    return _df[to_mask(bits, len(_df))].reset_index(drop=True)
+
+
+@st.cache_resource(show_spinner=False, max_entries=48)
+def get_chart(fingerprint, _args):
+    # Færdige figurer caches under et fingeraftryk af tallene - en uændret graf bygges ikke igen
+    return build_chart(*_args)
+
+
+@st.cache_resource(show_spinner=False, max_entries=48)
+def get_chart_json(fingerprint, _chart):
+    # Figurens JSON til HTML-rapporten - laves én gang pr. graf
+    return _chart.to_json(validate=False)
+
 
-if uploaded_file is not None:
-    # Indlæs data
-    df = pd.read_excel(uploaded_file)
+@st.cache_resource(show_spinner=False)
+def get_render_pool():
+    # Én pulje af varme Kaleido-processer pr. server - deles af alle sessioner
+    if RENDER_ARBEJDERE < 1:
+        return None
+    return start_render_pool(RENDER_ARBEJDERE)
+
+
+@st.cache_resource(show_spinner=False)
+def get_report_queue():
+    # Én kø pr. server - deles af alle sessioner, så samtidige klik venter i stedet for at rendere samtidig
+    return start_report_queue()
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_shared(name, version, _loader):
+    # Én read-only kopi pr. maskine - første proces indlæser og publicerer data og karantæne.
+    # Processen holder højst YDELSER_SHM_DATASÆT datasæt koblet på og slipper de ældste.
+    from delt_hukommelse import get_shared_dataset
+    loaded = {}
     
-    # Filtrer kun data hvor Antal >= 1
-    df = df[df['Antal'] >= 1].copy()
+    def load(i):
+        if 'data' not in loaded:
+            loaded['data'] = _loader()
+        return loaded['data'][i]
+    
+    df = get_shared_dataset(name, version, lambda: load(0))
+    quarantine = get_shared_dataset(f"{name}:karantæne", version, lambda: load(1))
+    return df, quarantine
+
+
+@st.fragment(run_every=1.0)
+def show_load_progress(job):
+    # Poller baggrundsindlæsningen - hele appen køres igen, når data er klar
+    if job['resultat'] is not None or job['fejl'] is not None:
+        st.rerun()
+    st.progress(job['fremdrift'], text=f"Indlæser hele filen i baggrunden... {job['fremdrift']:.0%}")
+
+
+@st.fragment(run_every=1.0)
+def show_report_progress(report_queue, job):
+    # Poller rapportjobbet - hele appen køres igen, når PDF'en er klar
+    if job['status'] in ('færdig', 'fejl'):
+        st.rerun()
+    if job['status'] == 'i kø':
+        text = f"Venter i kø ({queue_position(report_queue, job)} rapporter foran)"
+    else:
+        text = job['trin']
+    st.progress(job['fremdrift'], text=text)
+
+
+# Renderingspuljen til PDF-rapporten startes ved første kørsel og varmes op i baggrunden
+render_pool = get_render_pool()
+
+# Rapporter laves i en fælles baggrundskø med et fast antal tråde
+report_queue = get_report_queue()
+
+# Færdige rapporter og grafbilleder gemmes på disk og deles af alle sessioner
+report_cache = report_cache_dir(store_root or data_dir)
+
+
+data_sources = []
+if data_dir:
+    data_sources.append("Lokal mappe")
+if history_path:
+    data_sources.append("Historik-database")
+data_sources.append("Upload")
+
+data_source = "Upload"
+if len(data_sources) > 1:
+    data_source = st.sidebar.radio("Datakilde", options=data_sources)
+
+df = None
+quarantine = pd.DataFrame()
+history_conn = None
+is_preview = False
+try:
+    if data_source == "Historik-database":
+        history_conn = get_history(history_path)
+        dataset_key = f"historik:{os.path.abspath(history_path)}:{history_version(history_conn)}"
+        if not history_years(history_conn):
+            st.warning("⚠️ Historik-databasen er tom - indlæs en eksport og gem den i historikken")
+            history_conn = None
+    elif data_source == "Lokal mappe":
+        with st.spinner("Konverterer nye eksporter..."):
+            stores = sync_export_folder(data_dir, store_root)
+        
+        if stores:
+            selected_export = st.sidebar.selectbox("Vælg eksport", options=list(stores.keys()))
+            store_dir = str(stores[selected_export])
+            source_name = selected_export
+            dataset_key = os.path.basename(store_dir)
+            if use_shared_memory:
+                df, quarantine = get_shared(selected_export, os.path.basename(store_dir),
+                                            lambda: (open_column_store(store_dir), open_quarantine(store_dir)))
+            else:
+                df, quarantine = get_column_store(store_dir)
+        else:
+            st.warning(f"⚠️ Ingen Excel-filer fundet i {data_dir}")
+    else:
+        # File upload
+        uploaded_file = st.file_uploader("Upload dit datasæt (Excel-fil)", type=['xlsx', 'xls'])
+        
+        # Hurtig forhåndsvisning mens hele filen indlæses i baggrunden (kun .xlsx)
+        use_preview = not use_shared_memory and st.sidebar.checkbox(
+            "Hurtig forhåndsvisning af store filer", value=True,
+            help="Viser foreløbige grafer ud fra de første rækker, mens resten indlæses"
+        )
+        
+        if uploaded_file is not None:
+            upload_data = uploaded_file.getvalue()
+            upload_hash = hashlib.blake2b(upload_data, digest_size=16).hexdigest()
+            source_name = uploaded_file.name
+            dataset_key = f"upload:{upload_hash}"
+            
+            # Indlæs data
+            if use_preview and uploaded_file.name.lower().endswith('.xlsx'):
+                job = st.session_state.get('baggrundsindlæsning')
+                if job is None or job['id'] != upload_hash:
+                    job = start_background_load(upload_data, upload_hash)
+                    job['forhåndsvisning'] = load_preview(upload_data, PREVIEW_ROWS)
+                    st.session_state['baggrundsindlæsning'] = job
+                
+                if job['fejl'] is not None:
+                    raise job['fejl']
+                if job['resultat'] is not None:
+                    df, quarantine = job['resultat']
+                else:
+                    df, quarantine = job['forhåndsvisning']
+                    dataset_key += ":forhåndsvisning"
+                    is_preview = True
+            elif use_shared_memory:
+                # Delt under indholdets hash - ubrugte uploads fjernes efter YDELSER_SHM_LEVETID
+                df, quarantine = get_shared(dataset_key, upload_hash, lambda: load_export(uploaded_file))
+            else:
+                df, quarantine = load_export(uploaded_file)
+except ValueError as e:
+    st.error(f"❌ {e}")
+    st.stop()
+
+# Gem indlæst eksport i historik-databasen
+if history_path and df is not None and not is_preview:
+    if st.sidebar.button("💾 Gem i historik-database"):
+        with st.spinner("Gemmer i historik-databasen..."):
+            imported = import_export(get_history(history_path), df, source_name)
+        st.sidebar.success(f"✅ {imported:,} nye rækker gemt i historikken ({len(df) - imported:,} fandtes i forvejen)")
+
+if df is not None or history_conn is not None:
+    if history_conn is not None:
+        st.success(f"✅ Historik-database: {total_services(history_conn):,} ydelser")
+    elif is_preview:
+        st.info(f"⏳ Foreløbige tal baseret på de første {PREVIEW_ROWS:,} rækker - graferne skifter til de endelige tal, når hele filen er indlæst")
+        show_load_progress(st.session_state['baggrundsindlæsning'])
+    else:
+        st.success(f"✅ Data indlæst: {len(df)} rækker ({len(quarantine)} rækker sat i karantæne)")
     
-    # Konverter dato til datetime hvis ikke allerede
-    df['Ydelses dato'] = pd.to_datetime(df['Ydelses dato'])
+    # Valideringsrapport - rækker der ikke indgår i analysen
+    if len(quarantine) > 0:
+        with st.expander(f"⚠️ Datavalidering: {len(quarantine)} rækker udeladt"):
+            st.dataframe(summarize_quarantine(quarantine), hide_index=True)
+            st.dataframe(quarantine, hide_index=True)
+            st.download_button(
+                label="⬇️ Download karantæne (CSV)",
+                data=quarantine.to_csv(index=False).encode('utf-8-sig'),
+                file_name="karantaene.csv",
+                mime="text/csv"
+            )
     
-    st.success(f"✅ Data indlæst: {len(df)} rækker (efter filtrering af Antal >= 1)")
+    # Filtre på rækkeniveau (brugere, alder, kodegrupper, helligdage) før graferne
+    if df is not None:
+        with st.sidebar.expander("🔎 Filtre"):
+            conditions = []
+            
+            users = sorted(str(user) for user in pd.unique(df['Bruger']))
+            selected_users = st.multiselect("Brugere", options=users)
+            if selected_users:
+                conditions.append(('bruger', tuple(selected_users)))
+            
+            if 'Alder' in df.columns and st.checkbox("Filtrér på alder"):
+                min_age, max_age = st.slider("Alder", min_value=0, max_value=120, value=(60, 120))
+                conditions.append(('alder', min_age, max_age))
+            
+            if 'Køn' in df.columns:
+                selected_genders = st.multiselect("Køn", options=sorted(str(g) for g in pd.unique(df['Køn'].dropna())))
+                if selected_genders:
+                    conditions.append(('køn', tuple(selected_genders)))
+            
+            code_groups = {}
+            for group, subgroups in KODEHIERARKI.items():
+                code_groups[group] = tuple(code for codes in subgroups.values() for code in codes)
+                for subgroup, codes in subgroups.items():
+                    code_groups[f"{group} / {subgroup}"] = tuple(codes)
+            selected_groups = st.multiselect("Kodegrupper", options=list(code_groups))
+            if selected_groups:
+                conditions.append(('koder', tuple(sorted({code for g in selected_groups for code in code_groups[g]}))))
+            
+            combine = st.radio("Kombinér betingelser", options=["Alle (OG)", "Mindst én (ELLER)"], horizontal=True)
+            negate = st.checkbox("Vend betingelserne (IKKE)")
+            exclude_holidays = st.checkbox("Udelad helligdage")
+        
+        expression = None
+        if conditions:
+            expression = ('og' if combine == "Alle (OG)" else 'eller', tuple(conditions))
+            if negate:
+                expression = ('ikke', expression)
+        if exclude_holidays:
+            holiday_filter = ('ikke', ('helligdag',))
+            expression = holiday_filter if expression is None else ('og', (expression, holiday_filter))
+        
+        if expression is not None:
+            df = get_filtered(dataset_key, expression, df,
+                              get_bitmap_index(dataset_key, df, store_dir if data_source == "Lokal mappe" else None))
+            dataset_key = f"{dataset_key}:filter:{hashlib.blake2b(repr(expression).encode(), digest_size=8).hexdigest()}"
+            st.info(f"🔎 Filter aktivt: {len(df):,} rækker ({len(predicates(expression))} betingelser)")
+            if len(df) == 0:
+                st.warning("⚠️ Ingen rækker matcher filteret")
+                st.stop()
+    else:
+        st.sidebar.caption("Filtre kræver rækkedata og er ikke tilgængelige for historik-databasen")
     
     # Sidebar til periode-valg
     st.sidebar.header("Vælg Periode 1")
     
-    # Find tilgængelige år og måneder
-    min_date = df['Ydelses dato'].min()
-    max_date = df['Ydelses dato'].max()
-    
-    # Lav liste af tilgængelige år
-    available_years = sorted(df['Ydelses dato'].dt.year.unique())
+    # Månedlig rollup - graferne bruger kun aggregerede tal
+    if history_conn is not None:
+        years = history_years(history_conn)
+    else:
+        rollup = get_rollup(dataset_key, df)
+        years = available_years(rollup)
     
     # Valg af år
-    selected_year = st.sidebar.selectbox("Vælg år", available_years)
+    selected_year = st.sidebar.selectbox("Vælg år", years)
     
     # Valg af måned
     month_names = {
@@ -48,11 +390,7 @@ if uploaded_file is not None:
         9: "September", 10: "Oktober", 11: "November", 12: "December"
     }
     
-    month_names_short = {
-        1: "Jan", 2: "Feb", 3: "Mar", 4: "Apr",
-        5: "Maj", 6: "Jun", 7: "Jul", 8: "Aug",
-        9: "Sep", 10: "Okt", 11: "Nov", 12: "Dec"
-    }
+    month_names_short = MÅNEDER_KORT
     
     selected_month = st.sidebar.selectbox(
         "Vælg måned",
@@ -73,6 +411,11 @@ if uploaded_file is not None:
         options=["Søjlediagram", "Kurvediagram"]
     )
     
+    # Afvigelser i daglige antal vises som markører i graferne
+    show_anomalies = st.sidebar.checkbox("Vis afvigelser i graferne", value=True)
+    anomaly_threshold = st.sidebar.slider("Afvigelsesgrænse (z-score)", min_value=2.0, max_value=6.0,
+                                          value=3.0, step=0.5, disabled=not show_anomalies)
+    
     # Beregn periode 1
     start_date_p1 = datetime(selected_year, selected_month, 1)
     end_date_p1 = start_date_p1 + relativedelta(months=duration_months) - timedelta(days=1)
@@ -89,662 +432,472 @@ if uploaded_file is not None:
     st.sidebar.markdown("**Periode 2:**")
     st.sidebar.info(f"{start_date_p2.strftime('%b %Y')} - {end_date_p2.strftime('%b %Y')}")
     
-    # Filtrer data for begge perioder
-    df_p1 = df[(df['Ydelses dato'] >= start_date_p1) & (df['Ydelses dato'] <= end_date_p1)].copy()
-    df_p2 = df[(df['Ydelses dato'] >= start_date_p2) & (df['Ydelses dato'] <= end_date_p2)].copy()
-    
-    # Tilføj måned-kolonne (1, 2, 3, etc.)
-    df_p1['Måned_nr'] = ((df_p1['Ydelses dato'].dt.year - start_date_p1.year) * 12 + 
-                          df_p1['Ydelses dato'].dt.month - start_date_p1.month + 1)
-    df_p2['Måned_nr'] = ((df_p2['Ydelses dato'].dt.year - start_date_p2.year) * 12 + 
-                          df_p2['Ydelses dato'].dt.month - start_date_p2.month + 1)
-    
-    # Funktion til at generere måned-labels
-    def get_month_label(base_date, month_offset):
-        target_date = base_date + relativedelta(months=month_offset)
-        return f"{month_names_short[target_date.month]} {str(target_date.year)[2:]}"
+    # Hent månedlig rollup for begge perioder (Måned_nr = 1, 2, 3, ...)
+    if history_conn is not None:
+        df_p1 = query_period_rollup(history_conn, start_date_p1, duration_months)
+        df_p2 = query_period_rollup(history_conn, start_date_p2, duration_months)
+    else:
+        df_p1 = period_rollup(rollup, start_date_p1, duration_months)
+        df_p2 = period_rollup(rollup, start_date_p2, duration_months)
     
     # Check om der er data
     if len(df_p1) == 0 and len(df_p2) == 0:
         st.warning("⚠️ Ingen data fundet for de valgte perioder.")
     else:
-        # Funktion til at lave graf 1: Grundydelser - SØJLER
-        def create_grundydelser_bar_chart():
-            grundydelser_koder = [101, 125, 120]
-            
-            data_p1_total = df_p1[df_p1['Ydelseskode'].isin(grundydelser_koder)].groupby('Måned_nr').size()
-            data_p2_total = df_p2[df_p2['Ydelseskode'].isin(grundydelser_koder)].groupby('Måned_nr').size()
-            
-            # Beregn 120 for hver måned
-            kode_120_p1 = df_p1[df_p1['Ydelseskode'] == 120].groupby('Måned_nr').size()
-            kode_120_p2 = df_p2[df_p2['Ydelseskode'] == 120].groupby('Måned_nr').size()
+        # Tal til standardgraferne: (total, fremhævet) pr. (periode, måned) for hver graf
+        aggregates = chart_aggregates([df_p1, df_p2], duration_months)
+        
+        # Søjler har P1 og P2 side om side, kurver har en fælles x-akse med måned-navne
+        bar_labels, line_labels = chart_labels(start_date_p1, duration_months)
+        
+        # Vis graferne baseret på valgt type
+        st.header("Visualiseringer")
+        
+        # Afvigelser markeres på månedens søjle/punkt for den periode de ligger i
+        if show_anomalies:
+            anomalies = get_anomalies(dataset_key, anomaly_threshold, get_daily_matrix(dataset_key, df, history_conn))
+        
+        def anomaly_markers(chart_codes, total):
+            markers = []
+            periods = [(0, start_date_p1, end_date_p1), (1, start_date_p2, end_date_p2)]
+            for p, start_date, end_date in periods:
+                found = anomalies[
+                    (anomalies['Ydelseskode'].isin(chart_codes)) &
+                    (anomalies['Dato'] >= start_date) & (anomalies['Dato'] <= end_date)
+                ]
+                if len(found) == 0:
+                    continue
+                
+                found_month = ((found['Dato'].dt.year - start_date.year) * 12 +
+                               found['Dato'].dt.month - start_date.month + 1)
+                
+                marker = {'navn': f"Afvigelser P{p + 1}", 'x': [], 'y': [], 'tekst': []}
+                for month, month_found in found.groupby(found_month):
+                    if chart_type == "Søjlediagram":
+                        marker['x'].append(bar_labels[2 * (month - 1) + p])
+                    else:
+                        marker['x'].append(line_labels[month - 1])
+                    marker['y'].append(int(total[p, month - 1]))
+                    marker['tekst'].append("<br>".join(
+                        f"{row['Dato'].strftime('%d-%m-%Y')}: kode {row['Ydelseskode']} = {row['Antal']} "
+                        f"(forventet {row['Forventet']:.0f}, z = {row['z']:+.1f})"
+                        for _, row in month_found.iterrows()
+                    ))
+                markers.append(marker)
+            return markers
+        
+        charts = []
+        chart_fingerprints = []
+        chart_kind = 'søjler' if chart_type == "Søjlediagram" else 'kurver'
+        start_years = [start_date_p1.year, start_date_p2.year]
+        for spec, (total, highlighted) in zip(GRAFER, aggregates):
+            markers = anomaly_markers(spec['koder'], total) if show_anomalies else []
+            args = (spec, chart_kind, total, highlighted, bar_labels, line_labels, start_years, markers)
+            chart_fingerprints.append(chart_fingerprint(*args))
+            charts.append(get_chart(chart_fingerprints[-1], args))
+        
+        for chart in charts:
+            st.plotly_chart(chart, use_container_width=True)
+        
+        if show_anomalies and len(anomalies) > 0:
+            period_anomalies = anomalies[
+                ((anomalies['Dato'] >= start_date_p1) & (anomalies['Dato'] <= end_date_p1)) |
+                ((anomalies['Dato'] >= start_date_p2) & (anomalies['Dato'] <= end_date_p2))
+            ]
+            with st.expander(f"◆ Afvigelser i perioderne: {len(period_anomalies)} (alle koder)"):
+                st.dataframe(period_anomalies.sort_values('Dato'), hide_index=True, use_container_width=True)
+        
+        # Funktion til at lave drill-down graf for en node i kodehierarkiet
+        def create_drilldown_chart(path):
+            node_children = children(path)
             
             fig = go.Figure()
             
-            # Data for stacked bars
-            x_labels = []
-            y_red_p1 = []
-            y_blue_p1 = []
-            y_red_p2 = []
-            y_blue_p2 = []
-            annotations = []
-            
-            for month in range(1, duration_months + 1):
-                # Labels
-                label_p1 = get_month_label(start_date_p1, month - 1)
-                label_p2 = get_month_label(start_date_p2, month - 1)
-                
-                # Periode 1
-                total_p1 = data_p1_total.get(month, 0)
-                count_120_p1 = kode_120_p1.get(month, 0)
-                other_p1 = total_p1 - count_120_p1
-                pct_p1 = (count_120_p1 / total_p1 * 100) if total_p1 > 0 else 0
-                
-                x_labels.append(label_p1)
-                y_red_p1.append(count_120_p1)
-                y_blue_p1.append(other_p1)
-                
-                # Annotation for P1
-                annotations.append(dict(
-                    x=len(x_labels) - 1,
-                    y=total_p1,
-                    text=f"{pct_p1:.0f}%",
-                    showarrow=False,
-                    yshift=10,
-                    font=dict(color='red', size=11, weight='bold')
-                ))
-                
-                # Periode 2
-                total_p2 = data_p2_total.get(month, 0)
-                count_120_p2 = kode_120_p2.get(month, 0)
-                other_p2 = total_p2 - count_120_p2
-                pct_p2 = (count_120_p2 / total_p2 * 100) if total_p2 > 0 else 0
-                
-                x_labels.append(label_p2)
-                y_red_p2.append(count_120_p2)
-                y_blue_p2.append(other_p2)
-                
-                # Annotation for P2
-                annotations.append(dict(
-                    x=len(x_labels) - 1,
-                    y=total_p2,
-                    text=f"{pct_p2:.0f}%",
-                    showarrow=False,
-                    yshift=10,
-                    font=dict(color='red', size=11, weight='bold')
-                ))
-            
-            # Kombiner P1 og P2 data
-            y_red = []
-            y_blue = []
-            for i in range(duration_months):
-                y_red.append(y_red_p1[i])
-                y_red.append(y_red_p2[i])
-                y_blue.append(y_blue_p1[i])
-                y_blue.append(y_blue_p2[i])
-            
-            # Rød bundfarve (120-kode)
-            fig.add_trace(go.Bar(
-                x=x_labels,
-                y=y_red,
-                name='Kode 120',
-                marker_color='#DC143C',
-                showlegend=False
-            ))
-            
-            # Blå topfarve (andre grundydelser)
-            fig.add_trace(go.Bar(
-                x=x_labels,
-                y=y_blue,
-                name='Kode 101 + 125',
-                marker_color='#4169E1',
-                showlegend=False
-            ))
+            if node_children:
+                # Et søjlepar (P1/P2) pr. barn - summeret over hele perioden
+                child_paths = [path + (child,) for child in node_children]
+                x_labels = [node_label(child_path) for child_path in child_paths]
+                totals = [hierarchy_aggregates[child_path].sum(axis=1) for child_path in child_paths]
+                
+                fig.add_trace(go.Bar(x=x_labels, y=[int(t[0]) for t in totals],
+                                     name=f"{start_date_p1.strftime('%b %Y')} - {end_date_p1.strftime('%b %Y')}",
+                                     marker_color='#4169E1', text=[int(t[0]) for t in totals], textposition='outside'))
+                fig.add_trace(go.Bar(x=x_labels, y=[int(t[1]) for t in totals],
+                                     name=f"{start_date_p2.strftime('%b %Y')} - {end_date_p2.strftime('%b %Y')}",
+                                     marker_color='#87CEEB', text=[int(t[1]) for t in totals], textposition='outside'))
+                xaxis_title = "Undergruppe" if len(path) == 1 else ("Ydelseskode" if len(path) == 2 else "Gruppe")
+            else:
+                # Enkelt kode - fordelt på måneder
+                counts = hierarchy_aggregates[path]
+                month_labels = [month_names_short[(start_date_p1.month + month - 2) % 12 + 1]
+                                for month in range(1, duration_months + 1)]
+                
+                fig.add_trace(go.Bar(x=month_labels, y=counts[0].astype(int), name=f"P1 {start_date_p1.year}",
+                                     marker_color='#4169E1', text=counts[0].astype(int), textposition='outside'))
+                fig.add_trace(go.Bar(x=month_labels, y=counts[1].astype(int), name=f"P2 {start_date_p2.year}",
+                                     marker_color='#87CEEB', text=counts[1].astype(int), textposition='outside'))
+                xaxis_title = "Måned"
             
             fig.update_layout(
-                title="Graf 1: Grundydelser (101, 125, 120) - Rød = 120, Procent vist øverst",
-                xaxis_title="Måned",
+                title=f"Drill-down: {' › '.join(node_label(path[:i]) for i in range(len(path) + 1))}",
+                xaxis_title=xaxis_title,
                 yaxis_title="Antal",
-                barmode='stack',
-                height=500,
-                annotations=annotations,
-                xaxis=dict(tickangle=-45)
-            )
-            
-            return fig
-        
-        # Funktion til at lave graf 1: Grundydelser - KURVER
-        def create_grundydelser_line_chart():
-            grundydelser_koder = [101, 125, 120]
-            
-            # Beregn data for hver måned - fælles x-akse
-            month_labels = []
-            total_p1 = []
-            total_p2 = []
-            pct_120_p1 = []
-            pct_120_p2 = []
-            
-            for month in range(1, duration_months + 1):
-                # Fælles måned-label (kun måned-navn, ikke år/periode)
-                month_name = month_names_short[(start_date_p1.month + month - 2) % 12 + 1]
-                month_labels.append(month_name)
-                
-                # Periode 1
-                df_month_p1 = df_p1[df_p1['Måned_nr'] == month]
-                count_total_p1 = len(df_month_p1[df_month_p1['Ydelseskode'].isin(grundydelser_koder)])
-                count_120_p1 = len(df_month_p1[df_month_p1['Ydelseskode'] == 120])
-                pct_p1 = (count_120_p1 / count_total_p1 * 100) if count_total_p1 > 0 else 0
-                
-                total_p1.append(count_total_p1)
-                pct_120_p1.append(pct_p1)
-                
-                # Periode 2
-                df_month_p2 = df_p2[df_p2['Måned_nr'] == month]
-                count_total_p2 = len(df_month_p2[df_month_p2['Ydelseskode'].isin(grundydelser_koder)])
-                count_120_p2 = len(df_month_p2[df_month_p2['Ydelseskode'] == 120])
-                pct_p2 = (count_120_p2 / count_total_p2 * 100) if count_total_p2 > 0 else 0
-                
-                total_p2.append(count_total_p2)
-                pct_120_p2.append(pct_p2)
-            
-            # Opret figur med to y-akser
-            fig = make_subplots(specs=[[{"secondary_y": True}]])
-            
-            # Total antal - P1 (blå, fast linje)
-            fig.add_trace(
-                go.Scatter(x=month_labels, y=total_p1, name=f"Total {start_date_p1.year}/{str(start_date_p1.year+1)[2:]}", 
-                          line=dict(color='#4169E1', width=3), mode='lines+markers'),
-                secondary_y=False
-            )
-            
-            # Total antal - P2 (lyseblå, stiplet)
-            fig.add_trace(
-                go.Scatter(x=month_labels, y=total_p2, name=f"Total {start_date_p2.year}/{str(start_date_p2.year+1)[2:]}", 
-                          line=dict(color='#87CEEB', width=3, dash='dash'), mode='lines+markers'),
-                secondary_y=False
-            )
-            
-            # Procent 120 - P1 (rød, fast)
-            fig.add_trace(
-                go.Scatter(x=month_labels, y=pct_120_p1, name=f"120% {start_date_p1.year}/{str(start_date_p1.year+1)[2:]}", 
-                          line=dict(color='#DC143C', width=2), mode='lines+markers'),
-                secondary_y=True
-            )
-            
-            # Procent 120 - P2 (orange, stiplet)
-            fig.add_trace(
-                go.Scatter(x=month_labels, y=pct_120_p2, name=f"120% {start_date_p2.year}/{str(start_date_p2.year+1)[2:]}", 
-                          line=dict(color='#FF8C00', width=2, dash='dash'), mode='lines+markers'),
-                secondary_y=True
-            )
-            
-            # Opdater layout
-            fig.update_xaxes(title_text="Måned")
-            fig.update_yaxes(title_text="Antal ydelser", secondary_y=False, rangemode='tozero')
-            fig.update_yaxes(title_text="Procent 120", secondary_y=True)
-            
-            fig.update_layout(
-                title="Graf 1: Grundydelser (101, 125, 120)",
-                height=500,
-                hovermode='x unified',
+                barmode='group',
+                height=450,
                 legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
             )
             
             return fig
         
-        # Funktion til at lave graf 2: Besøg - SØJLER
-        def create_besøg_bar_chart():
-            besøg_koder = [121, 411, 421, 431, 441, 491]
-            
-            data_p1_total = df_p1[df_p1['Ydelseskode'].isin(besøg_koder)].groupby('Måned_nr').size()
-            data_p2_total = df_p2[df_p2['Ydelseskode'].isin(besøg_koder)].groupby('Måned_nr').size()
-            
-            # Beregn 121 for hver måned
-            kode_121_p1 = df_p1[df_p1['Ydelseskode'] == 121].groupby('Måned_nr').size()
-            kode_121_p2 = df_p2[df_p2['Ydelseskode'] == 121].groupby('Måned_nr').size()
-            
-            fig = go.Figure()
-            
-            # Data for stacked bars
-            x_labels = []
-            y_red_p1 = []
-            y_blue_p1 = []
-            y_red_p2 = []
-            y_blue_p2 = []
-            annotations = []
-            
-            for month in range(1, duration_months + 1):
-                # Labels
-                label_p1 = get_month_label(start_date_p1, month - 1)
-                label_p2 = get_month_label(start_date_p2, month - 1)
-                
-                # Periode 1
-                total_p1 = data_p1_total.get(month, 0)
-                count_121_p1 = kode_121_p1.get(month, 0)
-                other_p1 = total_p1 - count_121_p1
-                pct_p1 = (count_121_p1 / total_p1 * 100) if total_p1 > 0 else 0
-                
-                x_labels.append(label_p1)
-                y_red_p1.append(count_121_p1)
-                y_blue_p1.append(other_p1)
-                
-                # Annotation for P1
-                annotations.append(dict(
-                    x=len(x_labels) - 1,
-                    y=total_p1,
-                    text=f"{pct_p1:.0f}%",
-                    showarrow=False,
-                    yshift=10,
-                    font=dict(color='red', size=11, weight='bold')
-                ))
-                
-                # Periode 2
-                total_p2 = data_p2_total.get(month, 0)
-                count_121_p2 = kode_121_p2.get(month, 0)
-                other_p2 = total_p2 - count_121_p2
-                pct_p2 = (count_121_p2 / total_p2 * 100) if total_p2 > 0 else 0
-                
-                x_labels.append(label_p2)
-                y_red_p2.append(count_121_p2)
-                y_blue_p2.append(other_p2)
-                
-                # Annotation for P2
-                annotations.append(dict(
-                    x=len(x_labels) - 1,
-                    y=total_p2,
-                    text=f"{pct_p2:.0f}%",
-                    showarrow=False,
-                    yshift=10,
-                    font=dict(color='red', size=11, weight='bold')
-                ))
-            
-            # Kombiner P1 og P2 data
-            y_red = []
-            y_blue = []
-            for i in range(duration_months):
-                y_red.append(y_red_p1[i])
-                y_red.append(y_red_p2[i])
-                y_blue.append(y_blue_p1[i])
-                y_blue.append(y_blue_p2[i])
-            
-            # Rød bundfarve (121-kode)
-            fig.add_trace(go.Bar(
-                x=x_labels,
-                y=y_red,
-                name='Kode 121',
-                marker_color='#DC143C',
-                showlegend=False
-            ))
-            
-            # Blå topfarve (andre besøg)
-            fig.add_trace(go.Bar(
-                x=x_labels,
-                y=y_blue,
-                name='Øvrige besøg',
-                marker_color='#4169E1',
-                showlegend=False
+        # Drill-down i kodehierarkiet - alle niveauer er forudberegnet, så
+        # navigation mellem niveauer ikke kræver en ny gennemgang af data
+        st.markdown("---")
+        st.header("🔎 Drill-down i ydelseskoder")
+        
+        hierarchy_aggregates = get_hierarchy_aggregates(dataset_key, start_date_p1, duration_months, df_p1, df_p2)
+        
+        drill_path = tuple(st.session_state.get('drill_path', ()))
+        if drill_path not in hierarchy_aggregates:
+            drill_path = ()
+        
+        nav_down, nav_up = st.columns([3, 1])
+        drill_children = children(drill_path)
+        if drill_children:
+            with nav_down:
+                selected_child = st.selectbox(
+                    "Gå ned i",
+                    options=drill_children,
+                    format_func=lambda child: node_label(drill_path + (child,))
+                )
+                if st.button("⬇️ Drill ned"):
+                    st.session_state['drill_path'] = drill_path + (selected_child,)
+                    st.rerun()
+        if drill_path:
+            with nav_up:
+                if st.button("⬆️ Op et niveau"):
+                    st.session_state['drill_path'] = drill_path[:-1]
+                    st.rerun()
+        
+        st.plotly_chart(create_drilldown_chart(drill_path), use_container_width=True)
+        
+        # Alle ydelseskoder: top-koder og kode x måned heatmap
+        st.markdown("---")
+        st.header("📋 Alle ydelseskoder")
+        
+        codes, months, code_matrix = get_code_matrix(dataset_key, None if history_conn is not None else rollup,
+                                                     history_conn)
+        
+        if len(codes) > 0:
+            top_n = None
+            if len(codes) > 10:
+                top_n = st.slider("Antal koder i tabellen", min_value=10, max_value=len(codes), value=min(25, len(codes)))
+            st.dataframe(top_codes(codes, months, code_matrix, top_n), hide_index=True, use_container_width=True)
+            
+            heatmap_value = st.radio("Heatmap viser", options=["Antal", "Ændring ift. året før (%)"], horizontal=True)
+            
+            # Koder sorteres efter samlet antal, så de største ligger øverst
+            order = np.argsort(-code_matrix.sum(axis=1), kind='stable')
+            if heatmap_value == "Antal":
+                z = code_matrix[order]
+                colorscale = 'Blues'
+                zmid = None
+            else:
+                z = year_over_year(code_matrix)[1][order]
+                colorscale = 'RdBu'
+                zmid = 0
+            
+            fig_heatmap = go.Figure(go.Heatmap(
+                z=z,
+                x=[f"{month_names_short[m % 12 + 1]} {str(m // 12)[2:]}" for m in months],
+                y=[str(code) for code in codes[order]],
+                colorscale=colorscale,
+                zmid=zmid,
+                hovertemplate="Kode %{y}<br>%{x}<br>%{z}<extra></extra>"
             ))
-            
-            fig.update_layout(
-                title="Graf 2: Besøg (121, 411, 421, 431, 441, 491) - Rød = 121, Procent vist øverst",
-                xaxis_title="Måned",
-                yaxis_title="Antal",
-                barmode='stack',
-                height=500,
-                annotations=annotations,
-                xaxis=dict(tickangle=-45)
+            fig_heatmap.update_layout(
+                title=f"Ydelseskoder pr. måned ({len(codes)} koder × {len(months)} måneder)",
+                height=max(400, min(20 * len(codes), 4000)),
+                yaxis=dict(autorange='reversed', type='category'),
+                xaxis=dict(type='category', tickangle=-45)
             )
-            
-            return fig
+            st.plotly_chart(fig_heatmap, use_container_width=True)
         
-        # Funktion til at lave graf 2: Besøg - KURVER
-        def create_besøg_line_chart():
-            besøg_koder = [121, 411, 421, 431, 441, 491]
-            
-            # Fælles x-akse
-            month_labels = []
-            total_p1 = []
-            total_p2 = []
-            pct_121_p1 = []
-            pct_121_p2 = []
-            
-            for month in range(1, duration_months + 1):
-                # Fælles måned-label
-                month_name = month_names_short[(start_date_p1.month + month - 2) % 12 + 1]
-                month_labels.append(month_name)
-                
-                # Periode 1
-                df_month_p1 = df_p1[df_p1['Måned_nr'] == month]
-                count_total_p1 = len(df_month_p1[df_month_p1['Ydelseskode'].isin(besøg_koder)])
-                count_121_p1 = len(df_month_p1[df_month_p1['Ydelseskode'] == 121])
-                pct_p1 = (count_121_p1 / count_total_p1 * 100) if count_total_p1 > 0 else 0
-                
-                total_p1.append(count_total_p1)
-                pct_121_p1.append(pct_p1)
-                
-                # Periode 2
-                df_month_p2 = df_p2[df_p2['Måned_nr'] == month]
-                count_total_p2 = len(df_month_p2[df_month_p2['Ydelseskode'].isin(besøg_koder)])
-                count_121_p2 = len(df_month_p2[df_month_p2['Ydelseskode'] == 121])
-                pct_p2 = (count_121_p2 / count_total_p2 * 100) if count_total_p2 > 0 else 0
-                
-                total_p2.append(count_total_p2)
-                pct_121_p2.append(pct_p2)
-            
-            # Opret figur med to y-akser
-            fig = make_subplots(specs=[[{"secondary_y": True}]])
-            
-            # Total besøg - P1 (blå, fast)
-            fig.add_trace(
-                go.Scatter(x=month_labels, y=total_p1, name=f"Total {start_date_p1.year}/{str(start_date_p1.year+1)[2:]}",
-                          line=dict(color='#4169E1', width=3), mode='lines+markers'),
-                secondary_y=False
-            )
-            
-            # Total besøg - P2 (lyseblå, stiplet)
-            fig.add_trace(
-                go.Scatter(x=month_labels, y=total_p2, name=f"Total {start_date_p2.year}/{str(start_date_p2.year+1)[2:]}",
-                          line=dict(color='#87CEEB', width=3, dash='dash'), mode='lines+markers'),
-                secondary_y=False
-            )
-            
-            # Procent 121 - P1 (rød, fast)
-            fig.add_trace(
-                go.Scatter(x=month_labels, y=pct_121_p1, name=f"121% {start_date_p1.year}/{str(start_date_p1.year+1)[2:]}",
-                          line=dict(color='#DC143C', width=2), mode='lines+markers'),
-                secondary_y=True
-            )
-            
-            # Procent 121 - P2 (orange, stiplet)
-            fig.add_trace(
-                go.Scatter(x=month_labels, y=pct_121_p2, name=f"121% {start_date_p2.year}/{str(start_date_p2.year+1)[2:]}",
-                          line=dict(color='#FF8C00', width=2, dash='dash'), mode='lines+markers'),
-                secondary_y=True
-            )
-            
-            # Opdater layout
-            fig.update_xaxes(title_text="Måned")
-            fig.update_yaxes(title_text="Antal besøg", secondary_y=False, rangemode='tozero')
-            fig.update_yaxes(title_text="Procent 121", secondary_y=True)
-            
-            fig.update_layout(
-                title="Graf 2: Besøg (121, 411, 421, 431, 441, 491)",
-                height=500,
-                hovermode='x unified',
-                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-            )
-            
-            return fig
+        # Sæsonmønster: ugedag x ISO-uge for grundydelser og besøg, P1 mod P2
+        st.markdown("---")
+        st.header("📅 Sæsonmønster (ugedag × uge)")
         
-        # Funktion til at lave graf 3: Uddannelseslæger - SØJLER
-        def create_uddannelseslæger_bar_chart():
-            grundydelser_koder = [101, 125, 120]
-            erfarne_læger = ['mp', 'jn', 'jes', 'ah', 'cj', 'in']
-            
-            # Total grundydelser pr. måned
-            data_p1_total = df_p1[df_p1['Ydelseskode'].isin(grundydelser_koder)].groupby('Måned_nr').size()
-            data_p2_total = df_p2[df_p2['Ydelseskode'].isin(grundydelser_koder)].groupby('Måned_nr').size()
-            
-            # Uddannelseslæger (ikke de 6 erfarne)
-            data_p1_uddannelse = df_p1[
-                (df_p1['Ydelseskode'].isin(grundydelser_koder)) & 
-                (~df_p1['Bruger'].isin(erfarne_læger))
-            ].groupby('Måned_nr').size()
-            
-            data_p2_uddannelse = df_p2[
-                (df_p2['Ydelseskode'].isin(grundydelser_koder)) & 
-                (~df_p2['Bruger'].isin(erfarne_læger))
-            ].groupby('Måned_nr').size()
-            
-            fig = go.Figure()
-            
-            x_labels = []
-            y_red_p1 = []
-            y_blue_p1 = []
-            y_red_p2 = []
-            y_blue_p2 = []
-            annotations = []
-            
-            for month in range(1, duration_months + 1):
-                # Labels
-                label_p1 = get_month_label(start_date_p1, month - 1)
-                label_p2 = get_month_label(start_date_p2, month - 1)
-                
-                # Periode 1
-                total_p1 = data_p1_total.get(month, 0)
-                uddannelse_p1 = data_p1_uddannelse.get(month, 0)
-                erfarne_p1 = total_p1 - uddannelse_p1
-                pct_p1 = (uddannelse_p1 / total_p1 * 100) if total_p1 > 0 else 0
-                
-                x_labels.append(label_p1)
-                y_red_p1.append(uddannelse_p1)
-                y_blue_p1.append(erfarne_p1)
-                
-                # Annotation for P1
-                annotations.append(dict(
-                    x=len(x_labels) - 1,
-                    y=total_p1,
-                    text=f"{pct_p1:.0f}%",
-                    showarrow=False,
-                    yshift=10,
-                    font=dict(color='red', size=11, weight='bold')
-                ))
-                
-                # Periode 2
-                total_p2 = data_p2_total.get(month, 0)
-                uddannelse_p2 = data_p2_uddannelse.get(month, 0)
-                erfarne_p2 = total_p2 - uddannelse_p2
-                pct_p2 = (uddannelse_p2 / total_p2 * 100) if total_p2 > 0 else 0
-                
-                x_labels.append(label_p2)
-                y_red_p2.append(uddannelse_p2)
-                y_blue_p2.append(erfarne_p2)
-                
-                # Annotation for P2
-                annotations.append(dict(
-                    x=len(x_labels) - 1,
-                    y=total_p2,
-                    text=f"{pct_p2:.0f}%",
-                    showarrow=False,
-                    yshift=10,
-                    font=dict(color='red', size=11, weight='bold')
-                ))
-            
-            # Kombiner P1 og P2 data
-            y_red = []
-            y_blue = []
-            for i in range(duration_months):
-                y_red.append(y_red_p1[i])
-                y_red.append(y_red_p2[i])
-                y_blue.append(y_blue_p1[i])
-                y_blue.append(y_blue_p2[i])
-            
-            # Rød bundfarve (uddannelseslæger)
-            fig.add_trace(go.Bar(
-                x=x_labels,
-                y=y_red,
-                name='Uddannelseslæger',
-                marker_color='#DC143C',
-                showlegend=False
-            ))
-            
-            # Blå topfarve (erfarne læger)
-            fig.add_trace(go.Bar(
-                x=x_labels,
-                y=y_blue,
-                name='Erfarne læger',
-                marker_color='#4169E1',
-                showlegend=False
+        season_counts = get_season_matrix(dataset_key, start_date_p1, start_date_p2, end_date_p1, end_date_p2,
+                                          get_daily_matrix(dataset_key, df, history_conn))
+        season_col1, season_col2 = st.columns(2)
+        with season_col1:
+            season_group = st.radio("Gruppe", options=list(KODEHIERARKI), horizontal=True)
+        with season_col2:
+            season_view = st.radio("Visning", options=["P1 og P2", "Forskel (P2 - P1)"], horizontal=True)
+        
+        group_counts = season_counts[list(KODEHIERARKI).index(season_group)]
+        week_labels = [str(week) for week in range(1, UGER + 1)]
+        
+        if season_view == "P1 og P2":
+            fig_season = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.08,
+                                       subplot_titles=[f"P1: {start_date_p1.strftime('%b %Y')} - {end_date_p1.strftime('%b %Y')}",
+                                                       f"P2: {start_date_p2.strftime('%b %Y')} - {end_date_p2.strftime('%b %Y')}"])
+            zmax = max(group_counts.max(), 1)
+            for p in range(2):
+                fig_season.add_trace(go.Heatmap(
+                    z=group_counts[p], x=week_labels, y=UGEDAGE,
+                    colorscale='Blues', zmin=0, zmax=zmax, showscale=(p == 0),
+                    hovertemplate=f"P{p + 1}<br>Uge %{{x}}, %{{y}}<br>%{{z:.0f}} ydelser<extra></extra>"
+                ), row=p + 1, col=1)
+            fig_season.update_yaxes(autorange='reversed')
+            height = 520
+        else:
+            fig_season = go.Figure(go.Heatmap(
+                z=group_counts[1] - group_counts[0], x=week_labels, y=UGEDAGE,
+                colorscale='RdBu', zmid=0,
+                hovertemplate="Uge %{x}, %{y}<br>P2 - P1: %{z:+.0f}<extra></extra>"
             ))
-            
-            fig.update_layout(
-                title="Graf 3: Uddannelseslæger i procent af grundydelser - Rød = Uddannelseslæger, Procent vist øverst",
-                xaxis_title="Måned",
-                yaxis_title="Antal grundydelser",
-                barmode='stack',
-                height=500,
-                annotations=annotations,
-                xaxis=dict(tickangle=-45)
-            )
-            
-            return fig
+            fig_season.update_yaxes(autorange='reversed')
+            height = 320
         
-        # Funktion til at lave graf 3: Uddannelseslæger - KURVER
-        def create_uddannelseslæger_line_chart():
-            grundydelser_koder = [101, 125, 120]
-            erfarne_læger = ['mp', 'jn', 'jes', 'ah', 'cj', 'in']
-            
-            # Fælles x-akse
-            month_labels = []
-            total_p1 = []
-            total_p2 = []
-            pct_udd_p1 = []
-            pct_udd_p2 = []
-            
-            for month in range(1, duration_months + 1):
-                # Fælles måned-label
-                month_name = month_names_short[(start_date_p1.month + month - 2) % 12 + 1]
-                month_labels.append(month_name)
-                
-                # Periode 1
-                df_month_p1 = df_p1[df_p1['Måned_nr'] == month]
-                count_total_p1 = len(df_month_p1[df_month_p1['Ydelseskode'].isin(grundydelser_koder)])
-                count_udd_p1 = len(df_month_p1[
-                    (df_month_p1['Ydelseskode'].isin(grundydelser_koder)) & 
-                    (~df_month_p1['Bruger'].isin(erfarne_læger))
-                ])
-                pct_p1 = (count_udd_p1 / count_total_p1 * 100) if count_total_p1 > 0 else 0
-                
-                total_p1.append(count_total_p1)
-                pct_udd_p1.append(pct_p1)
-                
-                # Periode 2
-                df_month_p2 = df_p2[df_p2['Måned_nr'] == month]
-                count_total_p2 = len(df_month_p2[df_month_p2['Ydelseskode'].isin(grundydelser_koder)])
-                count_udd_p2 = len(df_month_p2[
-                    (df_month_p2['Ydelseskode'].isin(grundydelser_koder)) & 
-                    (~df_month_p2['Bruger'].isin(erfarne_læger))
-                ])
-                pct_p2 = (count_udd_p2 / count_total_p2 * 100) if count_total_p2 > 0 else 0
-                
-                total_p2.append(count_total_p2)
-                pct_udd_p2.append(pct_p2)
-            
-            # Opret figur med to y-akser
-            fig = make_subplots(specs=[[{"secondary_y": True}]])
-            
-            # Total antal - P1 (blå, fast)
-            fig.add_trace(
-                go.Scatter(x=month_labels, y=total_p1, name=f"Total {start_date_p1.year}/{str(start_date_p1.year+1)[2:]}",
-                          line=dict(color='#4169E1', width=3), mode='lines+markers'),
-                secondary_y=False
-            )
-            
-            # Total antal - P2 (lyseblå, stiplet)
-            fig.add_trace(
-                go.Scatter(x=month_labels, y=total_p2, name=f"Total {start_date_p2.year}/{str(start_date_p2.year+1)[2:]}",
-                          line=dict(color='#87CEEB', width=3, dash='dash'), mode='lines+markers'),
-                secondary_y=False
-            )
-            
-            # Procent uddannelseslæger - P1 (rød, fast)
-            fig.add_trace(
-                go.Scatter(x=month_labels, y=pct_udd_p1, name=f"Udd.læger% {start_date_p1.year}/{str(start_date_p1.year+1)[2:]}",
-                          line=dict(color='#DC143C', width=2), mode='lines+markers'),
-                secondary_y=True
-            )
-            
-            # Procent uddannelseslæger - P2 (orange, stiplet)
-            fig.add_trace(
-                go.Scatter(x=month_labels, y=pct_udd_p2, name=f"Udd.læger% {start_date_p2.year}/{str(start_date_p2.year+1)[2:]}",
-                          line=dict(color='#FF8C00', width=2, dash='dash'), mode='lines+markers'),
-                secondary_y=True
-            )
-            
-            # Opdater layout
-            fig.update_xaxes(title_text="Måned")
-            fig.update_yaxes(title_text="Antal grundydelser", secondary_y=False, rangemode='tozero')
-            fig.update_yaxes(title_text="Procent uddannelseslæger", secondary_y=True)
-            
-            fig.update_layout(
-                title="Graf 3: Uddannelseslæger i procent af grundydelser",
-                height=500,
-                hovermode='x unified',
-                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-            )
-            
-            return fig
+        fig_season.update_layout(
+            title=f"{season_group}: ydelser pr. ugedag og uge",
+            height=height,
+            xaxis=dict(type='category'),
+        )
+        st.plotly_chart(fig_season, use_container_width=True)
         
-        # Vis graferne baseret på valgt type
-        st.header("Visualiseringer")
+        # Daglig udvikling over hele datasættet - lange serier tegnes med WebGL og nedsamples
+        st.markdown("---")
+        st.header("📈 Daglig udvikling")
         
-        if chart_type == "Søjlediagram":
-            chart1 = create_grundydelser_bar_chart()
-            chart2 = create_besøg_bar_chart()
-            chart3 = create_uddannelseslæger_bar_chart()
-        else:  # Kurvediagram
-            chart1 = create_grundydelser_line_chart()
-            chart2 = create_besøg_line_chart()
-            chart3 = create_uddannelseslæger_line_chart()
+        daily_dates, daily_groups = get_daily_groups(dataset_key, get_daily_matrix(dataset_key, df, history_conn))
+        if len(daily_dates) > 1:
+            first_date = pd.Timestamp(daily_dates[0]).date()
+            last_date = pd.Timestamp(daily_dates[-1]).date()
+            
+            # Zoom: et smallere interval vises i fuld opløsning, når det kan være på plottets bredde
+            zoom_from, zoom_to = st.slider("Vis periode", min_value=first_date, max_value=last_date,
+                                           value=(first_date, last_date), format="DD-MM-YYYY")
+            shown = slice((zoom_from - first_date).days, (zoom_to - first_date).days + 1)
+            n_points = shown.stop - shown.start
+            
+            high_volume = st.checkbox("Højvolumen-visning (WebGL + nedsampling)", value=n_points > PIXEL_BREDDE,
+                                      help=f"Tegner med WebGL og nedsampler hver serie til {PIXEL_BREDDE} punkter")
+            
+            fig_daily = daily_chart(
+                f"Ydelser pr. dag, {zoom_from.strftime('%d-%m-%Y')} - {zoom_to.strftime('%d-%m-%Y')}",
+                daily_dates[shown],
+                {group: daily_groups[g, shown] for g, group in enumerate(KODEHIERARKI)},
+                high_volume,
+            )
+            st.plotly_chart(fig_daily, use_container_width=True)
+            if high_volume and n_points > PIXEL_BREDDE:
+                st.caption(f"Nedsamplet fra {n_points:,} til {PIXEL_BREDDE:,} punkter pr. serie - vælg en kortere periode for fuld opløsning")
+            else:
+                st.caption(f"Fuld opløsning: {n_points:,} punkter pr. serie")
         
-        st.plotly_chart(chart1, use_container_width=True)
-        st.plotly_chart(chart2, use_container_width=True)
-        st.plotly_chart(chart3, use_container_width=True)
+        # Rækkedata hentes kun fra historikken, når brugeren beder om det
+        if history_conn is not None and st.checkbox("Vis rækkedata for perioderne (max 10.000 rækker pr. periode)"):
+            st.dataframe(query_rows(history_conn, start_date_p1, end_date_p1), hide_index=True)
+            st.dataframe(query_rows(history_conn, start_date_p2, end_date_p2), hide_index=True)
         
         # PDF Download funktionalitet
         st.markdown("---")
         st.header("📥 Download rapport")
         
-        if st.button("Generer PDF-rapport", type="primary"):
-            with st.spinner("Genererer PDF..."):
-                # Gem graferne som billeder
-                img1 = chart1.to_image(format="png", width=1200, height=500)
-                img2 = chart2.to_image(format="png", width=1200, height=500)
-                img3 = chart3.to_image(format="png", width=1200, height=500)
-                
-                # Opret en simpel PDF med reportlab
-                from reportlab.lib.pagesizes import A4, landscape
-                from reportlab.pdfgen import canvas
-                from reportlab.lib.units import inch
-                
-                buffer = io.BytesIO()
-                c = canvas.Canvas(buffer, pagesize=landscape(A4))
-                width, height = landscape(A4)
-                
-                # Side 1
-                c.setFont("Helvetica-Bold", 16)
-                c.drawString(50, height - 50, f"Ydelsesanalyse - Periodesammenligning ({chart_type})")
-                c.setFont("Helvetica", 12)
-                c.drawString(50, height - 80, f"Periode 1: {start_date_p1.strftime('%b %Y')} - {end_date_p1.strftime('%b %Y')}")
-                c.drawString(50, height - 100, f"Periode 2: {start_date_p2.strftime('%b %Y')} - {end_date_p2.strftime('%b %Y')}")
-                
-                # Graf 1
-                c.drawImage(io.BytesIO(img1), 50, height - 400, width=700, height=250, preserveAspectRatio=True)
-                
-                c.showPage()
-                
-                # Side 2
-                c.drawImage(io.BytesIO(img2), 50, height - 350, width=700, height=250, preserveAspectRatio=True)
-                
-                c.showPage()
-                
-                # Side 3
-                c.drawImage(io.BytesIO(img3), 50, height - 350, width=700, height=250, preserveAspectRatio=True)
-                
-                c.save()
-                
-                buffer.seek(0)
-                
+        report_engine = st.radio("Grafer i rapporten", ["Vektor (ReportLab)", "Billeder (Kaleido)"], horizontal=True,
+                                 help="Vektorgrafer tegnes direkte i PDF'en uden browser og giver små, skarpe filer. "
+                                      "Billeder renderes med Kaleido og viser også afvigelsesmarkørerne.")
+        
+        # Billedkvalitet: opløsning og format for Kaleido-billederne
+        quality_profile = None
+        if report_engine == "Billeder (Kaleido)":
+            quality_profile = st.radio(
+                "Billedkvalitet", list(KVALITETER), index=list(KVALITETER).index(STANDARD_KVALITET), horizontal=True,
+                help=" · ".join(f"{name}: {quality['dpi']} DPI {quality['format'].upper()}"
+                                for name, quality in KVALITETER.items())
+            )
+        
+        # Samme data, perioder, diagramtype, kvalitet og rapportversion giver samme rapport.
+        # Grafernes fingeraftryk dækker filtre og afvigelsesmarkører.
+        def report_key_for(profile):
+            return chart_fingerprint(RAPPORT_VERSION, report_engine, profile, dataset_key, start_date_p1,
+                                     start_date_p2, duration_months, chart_type, chart_fingerprints)
+        
+        report_key = report_key_for(quality_profile)
+        pdf_path = cache_file(report_cache, report_key, '.pdf')
+        
+        # Størrelse og tid for de profiler, der allerede er lavet for dette udvalg
+        if quality_profile is not None:
+            made = []
+            for profile in KVALITETER:
+                profile_path = cache_file(report_cache, report_key_for(profile), '.pdf')
+                if profile_path is None:
+                    continue
+                text = f"{profile} {profile_path.stat().st_size / 1024:,.0f} KB"
+                profile_job = report_queue['jobs'].get(report_key_for(profile))
+                if profile_job is not None and profile_job['status'] == 'færdig':
+                    text += f" ({profile_job['afsluttet'] - profile_job['startet']:.1f} s)"
+                made.append(text)
+            if made:
+                st.caption("Lavet for dette udvalg: " + " · ".join(made))
+        
+        # Kaleido-sider: billeder fra cachen bruges direkte fra disk, resten renderes løbende
+        # i puljens varme processer og gemmes i cachen, før siden tegnes. Renderingstiden
+        # for hver graf lægges i render_times.
+        def image_pages(pool, render_times):
+            options = render_options(quality_profile)
+            suffix = '.jpg' if options['format'] == 'jpeg' else '.png'
+            image_keys = [chart_fingerprint(RAPPORT_VERSION, fingerprint, options) for fingerprint in chart_fingerprints]
+            cached = [cache_file(report_cache, key, suffix) for key in image_keys]
+            rendered = iter_rendered((charts[i] for i, path in enumerate(cached) if path is None), pool, **options)
+            for i, (key, path) in enumerate(zip(image_keys, cached)):
+                if path is None:
+                    image, seconds = next(rendered)
+                    render_times.append((i, seconds))
+                    cache_put(report_cache, key, suffix, image)
+                    yield image
+                else:
+                    yield path
+        
+        # Funktion til at lave rapporten i køens baggrundstråd - sessionen kører videre imens.
+        # Siderne laves og skrives én ad gangen direkte til en fil i rapportcachen.
+        def make_report(progress):
+            def with_progress(pages):
+                for page, graph in enumerate(pages, 1):
+                    progress((page - 1) / len(charts), f"Side {page} af {len(charts)}")
+                    yield graph
+            
+            header = report_header(chart_type, start_date_p1, end_date_p1, start_date_p2, end_date_p2)
+            with cache_writer(report_cache, report_key, '.pdf') as out:
+                if report_engine == "Vektor (ReportLab)":
+                    # Graferne tegnes direkte fra de samme arrays som Plotly-graferne
+                    write_report(with_progress(vector_pages(chart_kind, aggregates, bar_labels, line_labels, start_years)),
+                                 header, out)
+                else:
+                    render_times = []
+                    try:
+                        write_report(with_progress(image_pages(render_pool, render_times)), header, out)
+                    except BrokenProcessPool:
+                        get_render_pool.clear()
+                        out.seek(0)
+                        out.truncate()
+                        render_times.clear()
+                        write_report(with_progress(image_pages(None, render_times)), header, out)
+                    progress(1.0, renderingstid=render_times)
+            return cache_file(report_cache, report_key, '.pdf')
+        
+        # Samme rapport kan være bestilt af en anden session - så følges det job
+        job = report_queue['jobs'].get(report_key)
+        if (pdf_path is None and job is not None and job['status'] == 'færdig' and job['resultat'] is not None
+                and job['resultat'].exists()):
+            pdf_path = job['resultat']
+        
+        if pdf_path is None and job is not None and job['status'] in ('i kø', 'kører'):
+            show_report_progress(report_queue, job)
+        elif pdf_path is None:
+            if job is not None and job['status'] == 'fejl':
+                st.error(f"❌ PDF-rapporten kunne ikke laves: {job['fejl']}")
+            if st.button("Generer PDF-rapport", type="primary"):
+                job = submit_report(report_queue, report_key, make_report)
+                if job is None:
+                    st.warning("⏳ Der laves allerede mange rapporter - prøv igen om lidt.")
+                else:
+                    show_report_progress(report_queue, job)
+        elif job is not None and job['status'] == 'færdig':
+            st.caption(f"PDF genereret på {job['afsluttet'] - job['startet']:.2f} s "
+                       f"(ventede {job['startet'] - job['oprettet']:.1f} s i kø) · {pdf_path.stat().st_size / 1024:.0f} KB")
+            if job['detaljer'].get('renderingstid'):
+                st.caption("Renderingstid: " + " · ".join(f"Graf {i + 1} {seconds:.2f} s"
+                                                           for i, seconds in job['detaljer']['renderingstid']))
+        else:
+            st.caption(f"Rapporten er allerede genereret for dette udvalg · {pdf_path.stat().st_size / 1024:.0f} KB")
+        
+        if pdf_path is not None:
+            # Downloaden læses fra filen i rapportcachen
+            with open(pdf_path, 'rb') as pdf_file:
                 st.download_button(
                     label="⬇️ Download PDF",
-                    data=buffer,
+                    data=pdf_file,
                     file_name=f"ydelsesanalyse_{start_date_p1.strftime('%Y%m')}_{chart_type}.pdf",
                     mime="application/pdf"
                 )
-                
-                st.success("✅ PDF klar til download!")
+            
+            st.success("✅ PDF klar til download!")
+        
+        # Interaktiv HTML-rapport - graferne er allerede bygget, så den laves med det samme
+        html_key = chart_fingerprint(RAPPORT_VERSION, 'html', dataset_key, start_date_p1, start_date_p2,
+                                     duration_months, chart_type, chart_fingerprints)
+        html_path = cache_file(report_cache, html_key, '.html')
+        if html_path is None and st.button("Lav interaktiv HTML-rapport"):
+            t0 = time.perf_counter()
+            with cache_writer(report_cache, html_key, '.html') as out:
+                write_html_report(
+                    [get_chart_json(fingerprint, chart) for fingerprint, chart in zip(chart_fingerprints, charts)],
+                    [summary_table(spec, total, highlighted, line_labels, start_years)
+                     for spec, (total, highlighted) in zip(GRAFER, aggregates)],
+                    report_header(chart_type, start_date_p1, end_date_p1, start_date_p2, end_date_p2),
+                    out,
+                )
+            html_path = cache_file(report_cache, html_key, '.html')
+            st.caption(f"HTML-rapport lavet på {(time.perf_counter() - t0) * 1000:.0f} ms · "
+                       f"{html_path.stat().st_size / 1024 ** 2:.1f} MB (inkl. plotly.js)")
+        
+        if html_path is not None:
+            with open(html_path, 'rb') as html_file:
+                st.download_button(
+                    label="⬇️ Download HTML (interaktiv)",
+                    data=html_file,
+                    file_name=f"ydelsesanalyse_{start_date_p1.strftime('%Y%m')}_{chart_type}.html",
+                    mime="text/html"
+                )
+        
+        # Tallene bag graferne til BI-værktøjer - laves i rapportkøen, da en stor rollup
+        # kan tage tid at skrive til Excel
+        export_formats = ["Excel (.xlsx)"] + (["Parquet (.zip)", "Arrow (.zip)"] if HAR_PYARROW else [])
+        export_format = st.selectbox("Eksport af tal (rollup, grafernes tal og P1/P2-sammenligning)",
+                                     options=export_formats)
+        export_suffix = '.xlsx' if export_format == "Excel (.xlsx)" else '.zip'
+        export_key = chart_fingerprint(RAPPORT_VERSION, 'eksport', export_format, dataset_key,
+                                       start_date_p1, duration_months)
+        export_path = cache_file(report_cache, export_key, export_suffix)
+        
+        def make_export(progress):
+            progress(0.1, "Samler tabeller")
+            # Køens tråd bruger sin egen forbindelse til historikken
+            export_rollup = query_monthly_rollup(get_history(history_path)) if history_conn is not None else rollup
+            tables = export_tables(export_rollup, aggregates, start_date_p1, duration_months)
+            progress(0.3, f"Skriver {export_format}")
+            with cache_writer(report_cache, export_key, export_suffix) as out:
+                if export_format == "Excel (.xlsx)":
+                    write_excel(tables, out)
+                else:
+                    write_arrow_zip(tables, out, 'parquet' if export_format == "Parquet (.zip)" else 'arrow')
+            return cache_file(report_cache, export_key, export_suffix)
+        
+        export_job = report_queue['jobs'].get(export_key)
+        if export_path is None and export_job is not None and export_job['status'] in ('i kø', 'kører'):
+            show_report_progress(report_queue, export_job)
+        elif export_path is None:
+            if export_job is not None and export_job['status'] == 'fejl':
+                st.error(f"❌ Eksporten kunne ikke laves: {export_job['fejl']}")
+            if st.button("Lav eksport"):
+                export_job = submit_report(report_queue, export_key, make_export)
+                if export_job is None:
+                    st.warning("⏳ Der laves allerede mange rapporter - prøv igen om lidt.")
+                else:
+                    show_report_progress(report_queue, export_job)
+        else:
+            with open(export_path, 'rb') as export_file:
+                st.download_button(
+                    label=f"⬇️ Download {export_format}",
+                    data=export_file,
+                    file_name=f"ydelsesanalyse_{start_date_p1.strftime('%Y%m')}_{duration_months}mdr{export_suffix}",
+                    mime=("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                          if export_suffix == '.xlsx' else "application/zip")
+                )
 
-else:
+elif data_source == "Upload":
     st.info("👆 Upload venligst dit datasæt for at komme i gang")
     st.markdown("""
     ### Sådan bruges appen:
@@ -758,4 +911,33 @@ else:
     **Dataformat:**
     - Kolonner: Køn, Alder, Ydelseskode, Antal, Beløb, Ydelses dato, Bruger
     - Kun data med Antal >= 1 medtages i analysen
+    - Rækker med manglende Ydelseskode, ugyldig dato eller manglende bruger sættes i karantæne
+      og vises i valideringsrapporten
+    
+    **Lokal mappe:** Sæt miljøvariablen `YDELSER_DATAMAPPE` til en mappe med eksporter.
+    Hver fil konverteres én gang til et kolonnelager (`.npy` pr. kolonne + manifest),
+    som deles af alle sessioner. `YDELSER_LAGERMAPPE` kan pege lageret et andet sted hen.
+    
+    **Historik-database:** Med `YDELSER_HISTORIK` sat til en SQLite-fil kan indlæste eksporter
+    gemmes i historikken, og dashboardet kan åbnes direkte mod den uden upload.
+    
+    **PDF-rapport:** Som standard tegnes graferne som vektorgrafik direkte med ReportLab.
+    Vælges billeder, renderes de med Kaleido i en pulje af varme processer
+    (`YDELSER_RENDER_ARBEJDERE`, standard 3; 0 renderer i serverprocessen) og med en
+    kvalitetsprofil: Skærm (96 DPI JPEG, standard), Tryk (200 DPI PNG) eller Arkiv (300 DPI PNG).
+    Færdige rapporter og grafbilleder gemmes i en diskcache (`YDELSER_RAPPORTCACHE`,
+    loft `YDELSER_RAPPORTCACHE_MB`, standard 200 MB), så samme rapport hentes med det samme.
+    Den interaktive HTML-rapport er én fil med plotly.js indbygget og kan åbnes uden net.
+    Rapporterne laves i en baggrundskø (`YDELSER_RAPPORT_TRÅDE`, standard 2; højst
+    `YDELSER_RAPPORT_KØ` ventende, standard 8), så dashboardet kan bruges imens.
+    Alle rapporter for en måned kan laves uden UI med `python batchrapport.py <eksportmappe>`.
+    
+    **Eksport af tal:** Rollup, grafernes tal og P1/P2-sammenligningen kan hentes som Excel
+    eller - med `pyarrow` installeret - som Parquet/Arrow til BI-værktøjer.
+    
+    **Flere serverprocesser:** Med `YDELSER_DELT_HUKOMMELSE=1` lægges de indlæste kolonner
+    i delt hukommelse, så alle processer på maskinen kobler sig på én read-only kopi.
+    Hver proces holder højst `YDELSER_SHM_DATASÆT` datasæt koblet på (standard 8), og
+    datasæt, som ingen proces har brugt i `YDELSER_SHM_LEVETID` sekunder (standard 3600),
+    fjernes igen.
     """)
@@ -0,0 +1,170 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from dateutil.relativedelta import relativedelta
+
+from aggregater import monthly_rollup, period_rollup, available_years
+from diagrammer import GRAFER, chart_aggregates, chart_labels, build_chart
+from kolonnelager import EKSPORT_ENDELSER, sync_export_folder, open_column_store
+from pdfrapport import RAPPORT_VERSION, KVALITETER, STANDARD_KVALITET, render_options, vector_pages, report_header, write_report
+from rendering import start_renderer, iter_rendered
+
+# Batchrapporter uden browser-UI: hele matricen af rapporter (klinikker x startmåneder
+# x varigheder x diagramtyper) genereres i en pulje af arbejdsprocesser og skrives til
+# en mappe med et manifest. Hver klinik er én eksport i mappen (via kolonnelageret),
+# én eksportfil eller historik-databasen. Kør fx:
+#   python batchrapport.py /data/eksporter --ud rapporter --år 2023 --måneder 1 4 7 10
+
+VARIGHEDER = [3, 6, 9, 12]
+DIAGRAMTYPER = {'Søjlediagram': 'søjler', 'Kurvediagram': 'kurver'}
+MANIFEST_NAVN = 'manifest.json'
+
+# Rollups pr. klinik, motor og billedkvalitet - sættes én gang i hver arbejdsproces
+_KLINIKKER = {}
+_MOTOR = 'vektor'
+_KVALITET = STANDARD_KVALITET
+
+
+# Funktion til at hente den månedlige rollup for hver klinik i kilden. Klinikkerne
+# navngives efter hele filnavnet, så x.xls og x.xlsx ikke overskriver hinanden.
+def load_clinics(source, store_root=None):
+    source = Path(source)
+    if source.is_dir():
+        stores = sync_export_folder(source, store_root)
+        return {name: monthly_rollup(open_column_store(store_dir)) for name, store_dir in stores.items()}
+    if source.suffix.lower() in EKSPORT_ENDELSER:
+        from indlaesning import load_export
+        df, quarantine = load_export(source)
+        return {source.name: monthly_rollup(df)}
+
+    # Ellers en historik-database
+    from historik import connect, query_monthly_rollup
+    conn = connect(source, read_only=True)
+    try:
+        return {source.name: query_monthly_rollup(conn)}
+    finally:
+        conn.close()
+
+
+def _init_worker(clinics, engine, profile=STANDARD_KVALITET):
+    global _KLINIKKER, _MOTOR, _KVALITET
+    _KLINIKKER, _MOTOR, _KVALITET = clinics, engine, profile
+    if engine == 'kaleido':
+        start_renderer()
+
+
+# Funktion til at lave én rapport i en arbejdsproces. Returnerer rapportens manifestpost.
+def run_job(job, out_dir):
+    clinic, year, month, duration_months, chart_type = job
+    t0 = time.perf_counter()
+    entry = {'klinik': clinic, 'år': year, 'måned': month, 'måneder': duration_months, 'diagramtype': chart_type}
+
+    start_date_p1 = datetime(year, month, 1)
+    end_date_p1 = start_date_p1 + relativedelta(months=duration_months) - timedelta(days=1)
+    start_date_p2 = start_date_p1 + relativedelta(years=1)
+    end_date_p2 = start_date_p2 + relativedelta(months=duration_months) - timedelta(days=1)
+
+    rollup = _KLINIKKER[clinic]
+    df_p1 = period_rollup(rollup, start_date_p1, duration_months)
+    df_p2 = period_rollup(rollup, start_date_p2, duration_months)
+    if len(df_p1) == 0 and len(df_p2) == 0:
+        return dict(entry, status='ingen data')
+
+    aggregates = chart_aggregates([df_p1, df_p2], duration_months)
+    bar_labels, line_labels = chart_labels(start_date_p1, duration_months)
+    start_years = [start_date_p1.year, start_date_p2.year]
+    kind = DIAGRAMTYPER[chart_type]
+    if _MOTOR == 'vektor':
+        pages = vector_pages(kind, aggregates, bar_labels, line_labels, start_years)
+    else:
+        figures = (build_chart(spec, kind, total, highlighted, bar_labels, line_labels, start_years)
+                   for spec, (total, highlighted) in zip(GRAFER, aggregates))
+        pages = (image for image, seconds in iter_rendered(figures, **render_options(_KVALITET)))
+
+    # Siderne skrives én ad gangen direkte til filen
+    path = Path(out_dir) / clinic / f"ydelsesanalyse_{start_date_p1.strftime('%Y%m')}_{duration_months}mdr_{chart_type}.pdf"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'wb') as out:
+        write_report(pages, report_header(chart_type, start_date_p1, end_date_p1, start_date_p2, end_date_p2), out)
+    return dict(entry, status='ok', fil=str(path.relative_to(out_dir)), bytes=path.stat().st_size,
+                sekunder=round(time.perf_counter() - t0, 3))
+
+
+# Funktion til at lave alle kombinationer. years=None giver alle år med data,
+# hvor året efter (periode 2) også har data.
+def report_jobs(clinics, years=None, months=range(1, 13), durations=VARIGHEDER, chart_types=DIAGRAMTYPER):
+    jobs = []
+    for clinic, rollup in clinics.items():
+        clinic_years = years
+        if clinic_years is None:
+            data_years = available_years(rollup)
+            clinic_years = [year for year in data_years if year + 1 in data_years] or data_years
+        for year in clinic_years:
+            for month in months:
+                for duration_months in durations:
+                    for chart_type in chart_types:
+                        jobs.append((clinic, year, month, duration_months, chart_type))
+    return jobs
+
+
+# Funktion til at køre alle rapporter i en pulje og skrive manifestet
+def run_batch(clinics, jobs, out_dir, engine='vektor', workers=None, source=None, profile=STANDARD_KVALITET):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    t0 = time.perf_counter()
+
+    entries = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(clinics, engine, profile)) as pool:
+        futures = {pool.submit(run_job, job, out_dir): job for job in jobs}
+        for future in as_completed(futures):
+            try:
+                entry = future.result()
+            except Exception as e:
+                clinic, year, month, duration_months, chart_type = futures[future]
+                entry = {'klinik': clinic, 'år': year, 'måned': month, 'måneder': duration_months,
+                         'diagramtype': chart_type, 'status': 'fejl', 'fejl': f"{type(e).__name__}: {e}"}
+            entries.append(entry)
+            print(f"[{len(entries)}/{len(jobs)}] {entry['klinik']} {entry['år']}-{entry['måned']:02d} "
+                  f"{entry['måneder']} mdr {entry['diagramtype']}: {entry['status']}")
+
+    entries.sort(key=lambda entry: (entry['klinik'], entry['år'], entry['måned'], entry['måneder'], entry['diagramtype']))
+    manifest = {
+        'genereret': datetime.now().isoformat(timespec='seconds'),
+        'kilde': str(source) if source else None,
+        'rapportversion': RAPPORT_VERSION,
+        'motor': engine,
+        'kvalitet': profile if engine == 'kaleido' else None,
+        'sekunder': round(time.perf_counter() - t0, 3),
+        'rapporter': entries,
+    }
+    with open(out_dir / MANIFEST_NAVN, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generer PDF-rapporter for alle klinikker og perioder")
+    parser.add_argument('kilde', help="Mappe med eksporter, én eksportfil eller en historik-database")
+    parser.add_argument('--ud', default='rapporter', help="Mappe til rapporter og manifest")
+    parser.add_argument('--lager', default=os.environ.get("YDELSER_LAGERMAPPE"), help="Mappe til kolonnelageret")
+    parser.add_argument('--år', type=int, nargs='+', help="Startår for periode 1 (standard: alle med data)")
+    parser.add_argument('--måneder', type=int, nargs='+', default=list(range(1, 13)), choices=range(1, 13))
+    parser.add_argument('--varighed', type=int, nargs='+', default=VARIGHEDER, choices=VARIGHEDER)
+    parser.add_argument('--typer', nargs='+', default=list(DIAGRAMTYPER), choices=list(DIAGRAMTYPER))
+    parser.add_argument('--motor', default='vektor', choices=['vektor', 'kaleido'])
+    parser.add_argument('--kvalitet', default=STANDARD_KVALITET, choices=list(KVALITETER),
+                        help="Billedkvalitet for kaleido")
+    parser.add_argument('--arbejdere', type=int, default=None, help="Antal processer (standard: antal CPU'er)")
+    args = parser.parse_args()
+
+    clinics = load_clinics(args.kilde, args.lager)
+    jobs = report_jobs(clinics, args.år, args.måneder, args.varighed, args.typer)
+    manifest = run_batch(clinics, jobs, args.ud, args.motor, args.arbejdere, args.kilde, args.kvalitet)
+
+    done = sum(entry['status'] == 'ok' for entry in manifest['rapporter'])
+    print(f"{done} af {len(jobs)} rapporter skrevet til {args.ud} på {manifest['sekunder']:.1f} s")
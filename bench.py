@@ -0,0 +1,247 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+# Målinger af de tunge trin i appen. Kør fx:
+#   python bench.py datoer --rækker 1000000
+
+
+def _best_of(fn, repeat=3):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def _report(name, seconds, note=""):
+    print(f"  {name:<45} {seconds * 1000:>10.1f} ms  {note}")
+
+
+# Datonormalisering: serienumre, dd-mm-yyyy og blandede kolonner
+def bench_dates(rows):
+    from datoer import normalize_dates
+
+    rng = np.random.default_rng(0)
+    days = rng.integers(0, 5 * 365, rows)
+    dates = pd.Timestamp('2020-01-01') + pd.to_timedelta(days, unit='D')
+
+    serial = pd.Series((dates - pd.Timestamp('1899-12-30')).days.astype('float64'))
+    text = pd.Series(dates.strftime('%d-%m-%Y'))
+    mixed = text.astype(object).copy()
+    mixed[::3] = serial[::3]
+    mixed[1::7] = dates[1::7].strftime('%Y-%m-%d')
+
+    print(f"Datonormalisering, {rows:,} rækker")
+    for label, column in [('Excel-serienumre', serial), ('dd-mm-yyyy tekst', text), ('blandet kolonne', mixed)]:
+        seconds, _ = _best_of(lambda: normalize_dates(column))
+        _report(f"normalize_dates ({label})", seconds)
+
+        def baseline():
+            return pd.to_datetime(column, errors='coerce')
+
+        try:
+            seconds, result = _best_of(baseline, repeat=1)
+            correct = (result.to_numpy() == dates.to_numpy()).mean()
+            note = "" if correct > 0.99 else f"(kun {correct:.0%} korrekte datoer)"
+        except (ValueError, TypeError) as e:
+            seconds, note = float('nan'), f"(fejler: {type(e).__name__})"
+        _report(f"pd.to_datetime ({label})", seconds, note)
+
+
+# Validering i forhold til selve indlæsningen af Excel-filen
+def bench_validation(rows):
+    import io
+    from indlaesning import clean_export
+
+    rng = np.random.default_rng(0)
+    raw = pd.DataFrame({
+        'Køn': rng.choice(['M', 'K'], rows),
+        'Alder': rng.integers(0, 100, rows),
+        'Ydelseskode': rng.choice([101, 120, 125, 121, 411, 421, 431, 441, 491], rows).astype('float64'),
+        'Antal': rng.integers(0, 3, rows),
+        'Beløb': rng.random(rows) * 300,
+        'Ydelses dato': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 5 * 365, rows), unit='D'),
+        'Bruger': rng.choice(['mp', 'jn', 'jes', 'ah', 'cj', 'in', 'ab', 'cd'], rows),
+    })
+    raw.loc[raw.index[::1000], 'Ydelseskode'] = np.nan
+
+    print(f"Validering, {rows:,} rækker")
+    seconds, (valid, quarantine) = _best_of(lambda: clean_export(raw))
+    _report("clean_export (datoer + validering)", seconds, f"({len(quarantine):,} i karantæne)")
+
+    # Excel-indlæsning måles på en stikprøve og skaleres lineært
+    sample = raw.iloc[:20_000]
+    buffer = io.BytesIO()
+    sample.to_excel(buffer, index=False)
+    read_seconds, _ = _best_of(lambda: pd.read_excel(io.BytesIO(buffer.getvalue())), repeat=1)
+    read_seconds *= rows / len(sample)
+    _report("pd.read_excel (skaleret fra 20.000 rækker)", read_seconds,
+            f"(validering = {seconds / read_seconds:.1%} af indlæsning)")
+
+
+# Kombinerede udvalg: bitmap-indeks mod boolske masker over kolonnerne
+def bench_bitmaps(rows):
+    from aggregater import month_indices
+    from bitmapindeks import build_bitmap_index, select, popcount
+
+    rng = np.random.default_rng(0)
+    users = ['mp', 'jn', 'jes', 'ah', 'cj', 'in', 'uu1', 'uu2', 'uu3', 'uu4']
+    df = pd.DataFrame({
+        'Ydelseskode': rng.choice([101, 120, 125, 121, 411, 421, 431, 441, 491, 201, 2101, 7101], rows),
+        'Ydelses dato': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 5 * 365, rows), unit='D'),
+        'Bruger': pd.Categorical(rng.choice(users, rows)),
+    })
+    trainees = ['uu1', 'uu2', 'uu3', 'uu4']
+    months = [2023 * 12 + m - 1 for m in range(3, 7)]
+
+    print(f"Kode 120 for uddannelseslæger i måned 3-6, {rows:,} rækker")
+    seconds, index = _best_of(lambda: build_bitmap_index(df), repeat=1)
+    _report("build_bitmap_index (ved indlæsning)", seconds)
+
+    def with_masks():
+        mask = (
+            (df['Ydelseskode'] == 120) &
+            df['Bruger'].isin(trainees) &
+            np.isin(month_indices(df['Ydelses dato']), months)
+        )
+        return int(mask.sum())
+
+    def with_bitmaps():
+        return popcount(select(index, {'kode': [120], 'bruger': trainees, 'måned': months}))
+
+    mask_seconds, expected = _best_of(with_masks)
+    _report("==/isin-masker + sum", mask_seconds, f"({expected:,} rækker)")
+    bitmap_seconds, count = _best_of(with_bitmaps)
+    _report("bitmap OG/ELLER + popcount", bitmap_seconds,
+            f"({count:,} rækker, {mask_seconds / bitmap_seconds:.0f}x hurtigere)")
+    assert count == expected
+
+
+# Grafernes payload: typed arrays + procent som trace-tekst mod lister + én annotation pr. søjle
+def bench_chart_payload(rows):
+    import plotly.graph_objects as go
+    import plotly.io as pio
+    from diagrammer import GRAFER, bar_chart
+
+    # Tidligere opbygning af søjlegraferne (lister og én annotation pr. søjle)
+    def annotated_bar_chart(total, highlighted, x_labels):
+        red = highlighted.T.ravel().tolist()
+        totals = total.T.ravel().tolist()
+        annotations = [
+            dict(x=i, y=t, text=f"{(r / t * 100) if t > 0 else 0:.0f}%", showarrow=False, yshift=10,
+                 font=dict(color='red', size=11, weight='bold'))
+            for i, (t, r) in enumerate(zip(totals, red))
+        ]
+        fig = go.Figure()
+        fig.add_trace(go.Bar(x=x_labels, y=red, marker_color='#DC143C', showlegend=False))
+        fig.add_trace(go.Bar(x=x_labels, y=[t - r for t, r in zip(totals, red)], marker_color='#4169E1', showlegend=False))
+        fig.update_layout(barmode='stack', height=500, annotations=annotations, xaxis=dict(tickangle=-45))
+        return fig
+
+    rng = np.random.default_rng(0)
+    print("Søjlegraf (P1 og P2 side om side), payload og serialisering")
+    for label, n in [('12 måneder', 12), ('dagligt, 1 år', 365), ('dagligt, 5 år', 5 * 365)]:
+        total = rng.integers(500, 5000, (2, n))
+        highlighted = (total * rng.random((2, n))).astype(np.int64)
+        x_labels = [f"{p}-{i}" for i in range(n) for p in ('P1', 'P2')]
+
+        for name, build in [('annotationer + lister', lambda: annotated_bar_chart(total, highlighted, x_labels)),
+                            ('trace-tekst + typed arrays', lambda: bar_chart(GRAFER[0], total, highlighted, x_labels))]:
+            build_seconds, fig = _best_of(build)
+            json_seconds, payload = _best_of(lambda: pio.to_json(fig, validate=False))
+            _report(f"{label}: {name}", build_seconds + json_seconds,
+                    f"({len(payload) / 1024:,.0f} KB, heraf serialisering {json_seconds * 1000:.1f} ms)")
+
+
+def bench_pdf_report(rows):
+    from diagrammer import GRAFER, build_chart
+    import tempfile
+    import tracemalloc
+    from pdfrapport import KVALITETER, render_options, vector_pages, write_report, build_report
+    from rendering import render_figures
+
+    rng = np.random.default_rng(0)
+    months = 12
+    aggregates = []
+    for spec in GRAFER:
+        total = rng.integers(500, 5000, (2, months))
+        aggregates.append((total, (total * rng.random((2, months))).astype(np.int64)))
+    bar_labels = [f"M{m} {p}" for m in range(months) for p in ('P1', 'P2')]
+    line_labels = [f"M{m}" for m in range(months)]
+    header = ("Ydelsesanalyse", ["Periode 1", "Periode 2"])
+
+    def vector_report(kind):
+        return build_report(vector_pages(kind, aggregates, bar_labels, line_labels, [2023, 2024]), header)
+
+    def image_report(kind, options={}):
+        figures = [build_chart(spec, kind, t, h, bar_labels, line_labels, [2023, 2024])
+                   for spec, (t, h) in zip(GRAFER, aggregates)]
+        return build_report([image for image, seconds in render_figures(figures, **options)], header)
+
+    print("PDF-rapport med 3 grafer (12 måneder)")
+    for kind in ('søjler', 'kurver'):
+        seconds, pdf = _best_of(lambda: vector_report(kind))
+        _report(f"{kind}: vektor (ReportLab)", seconds, f"({len(pdf) / 1024:,.0f} KB)")
+        try:
+            seconds, pdf = _best_of(lambda: image_report(kind), repeat=1)
+        except Exception as e:
+            print(f"  {kind}: billeder (Kaleido) kan ikke måles her: {type(e).__name__}")
+            continue
+        _report(f"{kind}: billeder (Kaleido)", seconds, f"({len(pdf) / 1024:,.0f} KB)")
+
+    # Kvalitetsprofiler: filstørrelse og tid pr. profil for billedrapporten
+    print("Kvalitetsprofiler (søjler, Kaleido)")
+    for profile, quality in KVALITETER.items():
+        options = render_options(profile)
+        try:
+            seconds, pdf = _best_of(lambda: image_report('søjler', options), repeat=1)
+        except Exception as e:
+            print(f"  {profile}: kan ikke måles her: {type(e).__name__}")
+            continue
+        _report(f"{profile} ({quality['dpi']} DPI {quality['format'].upper()})", seconds,
+                f"({len(pdf) / 1024:,.0f} KB)")
+
+    # Spidsforbrug af hukommelse: alle sider i en liste og PDF'en i bytes, mod sider
+    # der laves én ad gangen og skrives direkte til en fil
+    def pages(n):
+        for _ in range(n // len(GRAFER)):
+            yield from vector_pages('søjler', aggregates, bar_labels, line_labels, [2023, 2024])
+
+    def peak_memory(fn):
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    def streamed(n):
+        with tempfile.TemporaryFile() as out:
+            write_report(pages(n), header, out)
+
+    print("Spidsforbrug af hukommelse (tracemalloc)")
+    for n in (3, 30, 90):
+        in_memory = peak_memory(lambda: build_report(list(pages(n)), header))
+        streaming = peak_memory(lambda: streamed(n))
+        print(f"  {n:>3} sider: liste + bytes {in_memory / 1024 ** 2:6.1f} MB, løbende til fil {streaming / 1024 ** 2:6.1f} MB")
+
+
+BENCHMARKS = {
+    'datoer': bench_dates,
+    'validering': bench_validation,
+    'bitmap': bench_bitmaps,
+    'grafer': bench_chart_payload,
+    'pdf': bench_pdf_report,
+}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Målinger af Ydelsesanalyse")
+    parser.add_argument('navn', choices=sorted(BENCHMARKS))
+    parser.add_argument('--rækker', type=int, default=1_000_000)
+    args = parser.parse_args()
+    BENCHMARKS[args.navn](args.rækker)
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+from aggregater import month_indices
+
+# Bitmap-indeks: for hver ydelseskode, bruger og måned en pakket bitmap
+# (np.packbits, 1 bit pr. række). Kombinerede udvalg som "kode 120 for
+# uddannelseslæger i måned 3-6" besvares med OG/ELLER på bitmaps, der er 8 gange
+# mindre end boolske masker, og antal rækker tælles med popcount.
+
+INDEKS_KOLONNER = ('kode', 'bruger', 'måned')
+
+# Popcount pr. byte for numpy-versioner uden np.bitwise_count
+_BYTE_BITS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def _index_values(df, kind):
+    if kind == 'kode':
+        return df['Ydelseskode'].to_numpy()
+    if kind == 'bruger':
+        return df['Bruger'].astype(str)
+    return month_indices(df['Ydelses dato'])
+
+
+# Funktion til at bygge indekset: {art: (værdier, bitmaps)} hvor bitmaps har én række pr. værdi
+def build_bitmap_index(df):
+    index = {'rækker': len(df)}
+    for kind in INDEKS_KOLONNER:
+        inverse, values = pd.factorize(_index_values(df, kind), sort=True)
+        values = np.asarray(values)
+        bitmaps = np.empty((len(values), (len(df) + 7) // 8), dtype=np.uint8)
+        for i in range(len(values)):
+            bitmaps[i] = np.packbits(inverse == i)
+        index[kind] = (values, bitmaps)
+    return index
+
+
+# Bitmap for rækker hvor en indekseret kolonne har en af værdierne (ELLER)
+def bitmap_for(index, kind, values):
+    index_values, bitmaps = index[kind]
+    rows = np.flatnonzero(np.isin(index_values, list(values)))
+    if len(rows) == 0:
+        return np.zeros(bitmaps.shape[1], dtype=np.uint8)
+    return np.bitwise_or.reduce(bitmaps[rows], axis=0)
+
+
+# Funktion til at lave et kombineret udvalg: ELLER inden for hver art, OG på tværs
+def select(index, selection):
+    result = None
+    for kind, values in selection.items():
+        bits = bitmap_for(index, kind, values)
+        result = bits if result is None else result & bits
+    if result is None:
+        return invert(np.zeros((index['rækker'] + 7) // 8, dtype=np.uint8), index['rækker'])
+    return result
+
+
+# IKKE - bits efter sidste række holdes på 0
+def invert(bits, rows):
+    inverted = ~bits
+    if rows % 8:
+        inverted[-1] &= np.uint8((0xFF << (8 - rows % 8)) & 0xFF)
+    return inverted
+
+
+# Antal rækker i et udvalg
+def popcount(bits):
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(bits).sum(dtype=np.int64))
+    return int(_BYTE_BITS[bits].sum(dtype=np.int64))
+
+
+# Boolsk maske til at udtrække rækkerne
+def to_mask(bits, rows):
+    return np.unpackbits(bits, count=rows).astype(bool)
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+# Normalisering af 'Ydelses dato': repræsentationen bestemmes én gang pr. kolonne,
+# så pandas ikke skal gætte format for hvert element.
+
+# Excel tæller dage fra 1899-12-30 (inkl. den fiktive 29. februar 1900)
+EXCEL_EPOCH = np.datetime64('1899-12-30', 'ns')
+NS_PR_DAG = 86_400 * 10**9
+
+# Gyldige Excel-serienumre (1900-01-01 til 9999-12-31) og yyyymmdd-heltal
+SERIAL_MIN, SERIAL_MAX = 1, 2_958_465
+YYYYMMDD_MIN, YYYYMMDD_MAX = 19000101, 99991231
+
+# Kendte tekstformater fra eksporterne - prøves i rækkefølge
+KNOWN_FORMATS = [
+    '%d-%m-%Y',
+    '%Y-%m-%d',
+    '%d.%m.%Y',
+    '%d/%m/%Y',
+    '%d-%m-%Y %H:%M:%S',
+    '%Y-%m-%d %H:%M:%S',
+    '%d-%m-%y',
+]
+
+SAMPLE_SIZE = 200
+
+
+# Funktion til at omregne Excel-serienumre aritmetisk
+def excel_serial_to_datetime(values):
+    values = np.asarray(values, dtype='float64')
+    valid = (values >= SERIAL_MIN) & (values <= SERIAL_MAX)
+    ns = np.where(valid, values, 0) * NS_PR_DAG
+    out = EXCEL_EPOCH + ns.round().astype('int64').astype('timedelta64[ns]')
+    out[~valid] = np.datetime64('NaT')
+    return out
+
+
+# Funktion til at finde det første kendte format, som hele stikprøven kan parses med
+def detect_format(strings):
+    sample = pd.Series(strings).dropna()
+    sample = sample.iloc[:SAMPLE_SIZE].astype(str).str.strip()
+    if len(sample) == 0:
+        return None
+
+    for fmt in KNOWN_FORMATS:
+        try:
+            pd.to_datetime(sample, format=fmt, errors='raise')
+            return fmt
+        except (ValueError, TypeError):
+            continue
+
+    return None
+
+
+def _parse_numbers(values):
+    values = np.asarray(values, dtype='float64')
+    finite = values[np.isfinite(values)]
+    if len(finite) and finite.min() >= YYYYMMDD_MIN and finite.max() <= YYYYMMDD_MAX:
+        # Heltal som 20240115
+        text = pd.Series(values).astype('Int64').astype(str)
+        return pd.to_datetime(text, format='%Y%m%d', errors='coerce').to_numpy()
+    return excel_serial_to_datetime(values)
+
+
+# Parser unikke tekstværdier: detekteret format først, derefter de øvrige kendte formater
+def _parse_text(uniques):
+    uniques = pd.Series(uniques, dtype=object).str.strip()
+
+    fmt = detect_format(uniques)
+    formats = ([fmt] if fmt else []) + [f for f in KNOWN_FORMATS if f != fmt]
+
+    parsed = pd.Series(pd.NaT, index=uniques.index, dtype='datetime64[ns]')
+    rest = uniques.notna()
+    for fmt in formats:
+        if not rest.any():
+            break
+        # Ét eksplicit format ad gangen på de værdier, der endnu ikke er parset
+        parsed[rest] = pd.to_datetime(uniques[rest], format=fmt, errors='coerce')
+        rest = parsed.isna() & uniques.notna()
+
+    if rest.any():
+        # Sidste udvej: pandas' egen tolkning med dansk dag-først
+        parsed[rest] = pd.to_datetime(uniques[rest], format='mixed', dayfirst=True, errors='coerce')
+
+    return parsed.to_numpy()
+
+
+# Parser unikke værdier af blandet type - hver repræsentation håndteres samlet via masker
+def _parse_mixed(uniques):
+    values = np.asarray(uniques, dtype=object)
+    out = np.full(len(values), np.datetime64('NaT'), dtype='datetime64[ns]')
+
+    obj = pd.Series(values, dtype=object)
+    is_string = np.array([isinstance(v, str) for v in values], dtype=bool)
+    numbers = pd.to_numeric(obj.where(~is_string), errors='coerce').to_numpy(dtype='float64')
+    is_number = ~is_string & np.isfinite(numbers)
+    is_datetime = ~is_string & ~is_number & obj.notna().to_numpy()
+
+    if is_datetime.any():
+        out[is_datetime] = pd.to_datetime(obj[is_datetime], errors='coerce').to_numpy(dtype='datetime64[ns]')
+    if is_number.any():
+        out[is_number] = _parse_numbers(numbers[is_number])
+    if is_string.any():
+        out[is_string] = _parse_text(values[is_string])
+
+    return out
+
+
+# Funktion til at normalisere en datokolonne til datetime64[ns] (ugyldige værdier bliver NaT)
+def normalize_dates(s):
+    s = pd.Series(s)
+
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s.astype('datetime64[ns]')
+
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        return pd.Series(_parse_numbers(s.to_numpy()), index=s.index, name=s.name)
+
+    kind = pd.api.types.infer_dtype(s, skipna=True)
+    if kind in ('datetime', 'datetime64', 'date'):
+        return pd.to_datetime(s, errors='coerce').astype('datetime64[ns]')
+    if kind == 'empty':
+        return pd.Series(pd.NaT, index=s.index, name=s.name, dtype='datetime64[ns]')
+
+    # Eksporterne har få forskellige datoer - hver unik værdi parses kun én gang
+    codes, uniques = pd.factorize(s.astype(object))
+    parse = _parse_text if kind == 'string' else _parse_mixed
+    out = parse(uniques)[codes]
+    out[codes < 0] = np.datetime64('NaT')
+
+    return pd.Series(out, index=s.index, name=s.name)
@@ -0,0 +1,214 @@
+import atexit
+import fcntl
+import json
+import os
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+
+import numpy as np
+
+from kolonnelager import encode_columns, decode_columns
+
+# Delt datasæt på tværs af Streamlit-processer: kolonnerne lægges i
+# multiprocessing.shared_memory-segmenter, og et register (JSON-fil med fil-lås)
+# holder styr på hvilke segmenter der hører til hvilket datasæt, og hvilke
+# processer der er koblet på. Segmenter fra et udskiftet datasæt fjernes, når
+# den sidste proces har sluppet dem. Et aktivt datasæt, som ingen proces har holdt i
+# YDELSER_SHM_LEVETID sekunder, fjernes også, så gamle uploads ikke bliver liggende.
+
+REGISTER_DIR = Path(os.environ.get("YDELSER_SHM_REGISTER", Path(tempfile.gettempdir()) / "ydelser-shm"))
+REGISTER_FIL = REGISTER_DIR / "register.json"
+LAAS_FIL = REGISTER_DIR / "register.lock"
+LEVETID = float(os.environ.get("YDELSER_SHM_LEVETID", "3600"))
+
+# Højst så mange datasæt holdes koblet på pr. proces - de længst ubrugte slippes
+MAKS_DATASÆT = int(os.environ.get("YDELSER_SHM_DATASÆT", "8"))
+
+# Segmenter som denne proces er koblet på: (navn, generation) -> liste af SharedMemory
+_attached = {}
+
+
+@contextmanager
+def _locked_registry():
+    REGISTER_DIR.mkdir(parents=True, exist_ok=True)
+    with open(LAAS_FIL, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            registry = json.loads(REGISTER_FIL.read_text()) if REGISTER_FIL.exists() else {}
+            yield registry
+            tmp = REGISTER_FIL.with_suffix('.tmp')
+            tmp.write_text(json.dumps(registry, ensure_ascii=False))
+            os.replace(tmp, REGISTER_FIL)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+# Åbn et segment uden at Pythons resource_tracker sletter det, når processen lukker
+def _open_segment(name, create=False, size=0):
+    try:
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    except TypeError:
+        # Python < 3.13 har ikke track-parameteren
+        shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+def _unlink_segments(generation):
+    for col in generation['kolonner']:
+        try:
+            # Almindelig (sporet) åbning, så unlink() også afmelder segmentet igen
+            shm = shared_memory.SharedMemory(name=col['segment'])
+        except FileNotFoundError:
+            continue
+        shm.close()
+        shm.unlink()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# Fjern døde processer og ryd segmenter fra udskiftede generationer uden holdere og
+# fra aktive generationer, som ingen har holdt i LEVETID sekunder
+def _collect(registry):
+    now = time.time()
+    for name in list(registry):
+        entry = registry[name]
+        for gen_id in list(entry['generationer']):
+            generation = entry['generationer'][gen_id]
+            generation['holdere'] = [pid for pid in generation['holdere'] if _pid_alive(pid)]
+            if generation['holdere']:
+                generation.pop('sluppet', None)
+                continue
+            generation.setdefault('sluppet', now)
+            if gen_id != entry['aktiv'] or now - generation['sluppet'] > LEVETID:
+                _unlink_segments(generation)
+                del entry['generationer'][gen_id]
+                if gen_id == entry['aktiv']:
+                    entry['aktiv'] = None
+        if not entry['generationer']:
+            del registry[name]
+
+
+# Funktion til at lægge et datasæt i delt hukommelse (erstatter evt. tidligere version).
+# Processen holder den nye generation, til den slippes. Returnerer generationens id.
+def publish_dataset(name, df, version):
+    entries, arrays = encode_columns(df)
+
+    gen_id = uuid.uuid4().hex[:12]
+    columns = []
+    segments = []
+    for i, (entry, arr) in enumerate(zip(entries, arrays)):
+        segment = f"yd_{gen_id}_{i}"
+        shm = _open_segment(segment, create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[:] = arr
+        segments.append(shm)
+        columns.append(dict(entry, segment=segment, længde=int(arr.shape[0])))
+
+    with _locked_registry() as registry:
+        _collect(registry)
+        entry = registry.setdefault(name, {'aktiv': None, 'generationer': {}})
+        entry['generationer'][gen_id] = {'version': version, 'kolonner': columns, 'holdere': [os.getpid()]}
+        entry['aktiv'] = gen_id
+    _attached[(name, gen_id)] = segments
+
+    return gen_id
+
+
+# Funktion til at koble sig read-only på den aktive version af et datasæt - eller på en
+# bestemt generation (gen_id), fx den processen selv har publiceret. None, hvis den ikke findes.
+def attach_dataset(name, version=None, gen_id=None):
+    with _locked_registry() as registry:
+        entry = registry.get(name)
+        if entry is None:
+            return None
+        if gen_id is None:
+            gen_id = entry['aktiv']
+        generation = entry['generationer'].get(gen_id)
+        if generation is None or (version is not None and generation['version'] != version):
+            return None
+
+        if (name, gen_id) in _attached:
+            # Senest brugt - flyttes bagerst
+            _attached[(name, gen_id)] = _attached.pop((name, gen_id))
+        else:
+            segments = [_open_segment(col['segment']) for col in generation['kolonner']]
+            _attached[(name, gen_id)] = segments
+            if os.getpid() not in generation['holdere']:
+                generation['holdere'].append(os.getpid())
+
+        # Ryddes først, når denne proces holder generationen
+        _collect(registry)
+
+    segments = _attached[(name, gen_id)]
+    arrays = []
+    for col, shm in zip(generation['kolonner'], segments):
+        arr = np.ndarray((col['længde'],), dtype=col['dtype'], buffer=shm.buf)
+        arr.flags.writeable = False
+        arrays.append(arr)
+
+    return gen_id, decode_columns(generation['kolonner'], arrays)
+
+
+# Funktion til at slippe et datasæt - sidste holder af en udskiftet version rydder op
+def release_dataset(name, gen_id):
+    segments = _attached.pop((name, gen_id), None)
+    if segments is None:
+        return
+
+    with _locked_registry() as registry:
+        generation = registry.get(name, {}).get('generationer', {}).get(gen_id)
+        if generation is not None and os.getpid() in generation['holdere']:
+            generation['holdere'].remove(os.getpid())
+        _collect(registry)
+
+    for shm in segments:
+        try:
+            shm.close()
+        except BufferError:
+            # Arrays peger stadig på bufferen - mappingen frigives når de slippes
+            pass
+
+
+# Funktion til at hente et delt datasæt - indlæser og publicerer kun hvis ingen har gjort det
+def get_shared_dataset(name, version, loader):
+    attached = attach_dataset(name, version)
+    if attached is None:
+        # Der kobles på netop den publicerede generation - en anden proces kan have
+        # publiceret en nyere version imens
+        loaded = loader()
+        attached = attach_dataset(name, gen_id=publish_dataset(name, loaded, version))
+        if attached is None:
+            # Registret er ryddet imens - den indlæste kopi bruges direkte
+            return loaded
+
+    # Slip ældre generationer af samme datasæt og de længst ubrugte andre datasæt
+    gen_id, df = attached
+    for key in list(_attached):
+        if key[0] == name and key[1] != gen_id:
+            release_dataset(*key)
+    for key in list(_attached)[:-MAKS_DATASÆT]:
+        if key != (name, gen_id):
+            release_dataset(*key)
+
+    return df
+
+
+@atexit.register
+def _release_all():
+    for key in list(_attached):
+        try:
+            release_dataset(*key)
+        except Exception:
+            pass
@@ -0,0 +1,247 @@
+import hashlib
+
+import numpy as np
+import plotly.graph_objects as go
+
+from nedsampling import PIXEL_BREDDE, lttb
+
+# Graffabrik: de tre standardgrafer beskrives som data (kodegruppe, fremhævet del,
+# navne og titler), og figurerne bygges fra faste layout-skabeloner ud fra
+# forudberegnede (periode x måned) arrays. En ny graf er en ny beskrivelse i GRAFER.
+# Færdige figurer kan caches under et fingeraftryk af beskrivelsen og de tal de
+# bygges af, så en uændret graf ikke bygges igen ved en rerun.
+# Tal sendes som numpy-arrays, som plotly (>= 6) koder binært (typed arrays) i
+# stedet for JSON-lister, og procenterne på søjlerne er tekst på selve trace'en
+# i stedet for én annotation pr. søjle.
+
+ERFARNE_LÆGER = ['mp', 'jn', 'jes', 'ah', 'cj', 'in']
+
+# Fremhævet del (rød) er enten bestemte koder eller rækker fra andre end de erfarne læger
+GRAFER = [
+    {
+        'titel': "Graf 1: Grundydelser (101, 125, 120)",
+        'søjle_undertitel': "Rød = 120, Procent vist øverst",
+        'koder': [101, 125, 120],
+        'fremhæv': ('koder', [120]),
+        'navne': ('Kode 120', 'Kode 101 + 125'),
+        'antal_titel': ('Antal', 'Antal ydelser'),
+        'procent_navn': '120%',
+        'procent_titel': 'Procent 120',
+    },
+    {
+        'titel': "Graf 2: Besøg (121, 411, 421, 431, 441, 491)",
+        'søjle_undertitel': "Rød = 121, Procent vist øverst",
+        'koder': [121, 411, 421, 431, 441, 491],
+        'fremhæv': ('koder', [121]),
+        'navne': ('Kode 121', 'Øvrige besøg'),
+        'antal_titel': ('Antal', 'Antal besøg'),
+        'procent_navn': '121%',
+        'procent_titel': 'Procent 121',
+    },
+    {
+        'titel': "Graf 3: Uddannelseslæger i procent af grundydelser",
+        'søjle_undertitel': "Rød = Uddannelseslæger, Procent vist øverst",
+        'koder': [101, 125, 120],
+        'fremhæv': ('ikke_brugere', ERFARNE_LÆGER),
+        'navne': ('Uddannelseslæger', 'Erfarne læger'),
+        'antal_titel': ('Antal grundydelser', 'Antal grundydelser'),
+        'procent_navn': 'Udd.læger%',
+        'procent_titel': 'Procent uddannelseslæger',
+    },
+]
+
+MÅNEDER_KORT = {
+    1: "Jan", 2: "Feb", 3: "Mar", 4: "Apr",
+    5: "Maj", 6: "Jun", 7: "Jul", 8: "Aug",
+    9: "Sep", 10: "Okt", 11: "Nov", 12: "Dec"
+}
+
+FARVER = {
+    'rød': '#DC143C',
+    'blå': '#4169E1',
+    'lyseblå': '#87CEEB',
+    'orange': '#FF8C00',
+}
+
+# Layout-skabeloner - kopieres og udfyldes med titler pr. graf
+SØJLE_LAYOUT = dict(
+    xaxis_title="Måned",
+    barmode='stack',
+    height=500,
+    xaxis=dict(tickangle=-45),
+)
+
+# Procent over hver søjlestak - tekst på den øverste trace, så stakken ikke skubber den
+PROCENT_TEKST = dict(
+    texttemplate='%{text:.0f}%',
+    textposition='outside',
+    textangle=0,
+    constraintext='none',
+    cliponaxis=False,
+    textfont=dict(color='red', size=11, weight='bold'),
+    hoverinfo='x+y+name',
+)
+
+# Samme akser som make_subplots(specs=[[{"secondary_y": True}]])
+KURVE_LAYOUT = dict(
+    height=500,
+    hovermode='x unified',
+    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+)
+
+
+DAGLIG_LAYOUT = dict(
+    xaxis_title="Dato",
+    yaxis=dict(title_text="Antal pr. dag", rangemode='tozero'),
+    height=450,
+    hovermode='x unified',
+    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+)
+
+
+# Funktion til at beregne (total, fremhævet) pr. (periode, måned) for alle grafer.
+# periods er periode-rollups (fx [df_p1, df_p2]) med Måned_nr 1..duration.
+def chart_aggregates(periods, duration_months, specs=GRAFER):
+    columns = []
+    for period in periods:
+        columns.append((
+            period['Ydelseskode'].to_numpy(),
+            period['Måned_nr'].to_numpy().astype(np.int64) - 1,
+            period['Antal ydelser'].to_numpy().astype(np.float64),
+            np.asarray(period['Bruger'], dtype=object),
+        ))
+
+    aggregates = []
+    for spec in specs:
+        total = np.zeros((len(periods), duration_months), dtype=np.int64)
+        highlighted = np.zeros((len(periods), duration_months), dtype=np.int64)
+        for p, (codes, months, counts, users) in enumerate(columns):
+            in_group = np.isin(codes, spec['koder'])
+            kind, values = spec['fremhæv']
+            if kind == 'koder':
+                in_highlight = in_group & np.isin(codes, values)
+            else:
+                in_highlight = in_group & ~np.isin(users, values)
+            total[p] = np.bincount(months, weights=counts * in_group, minlength=duration_months)[:duration_months]
+            highlighted[p] = np.bincount(months, weights=counts * in_highlight, minlength=duration_months)[:duration_months]
+        aggregates.append((total, highlighted))
+
+    return aggregates
+
+
+# Funktion til at lave x-akse-labels: søjler har P1 og P2 side om side ("Jan 23", "Jan 24", ...),
+# kurver har en fælles akse med månedsnavne. P2 starter et år efter P1.
+def chart_labels(start_date, duration_months):
+    bar_labels = []
+    line_labels = []
+    for month in range(duration_months):
+        month_index = start_date.year * 12 + start_date.month - 1 + month
+        year, month_nr = divmod(month_index, 12)
+        bar_labels.append(f"{MÅNEDER_KORT[month_nr + 1]} {str(year)[2:]}")
+        bar_labels.append(f"{MÅNEDER_KORT[month_nr + 1]} {str(year + 1)[2:]}")
+        line_labels.append(MÅNEDER_KORT[month_nr + 1])
+    return bar_labels, line_labels
+
+
+# Procent fremhævet af total (0 hvor total er 0)
+def _percent(highlighted, total):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(total > 0, highlighted / total * 100, 0)
+
+
+# Sæson-navn til kurvernes forklaring, fx "2023/24"
+def season_label(year):
+    return f"{year}/{str(year + 1)[2:]}"
+
+
+# Søjler: P1 og P2 side om side for hver måned, rød fremhævet del nederst og procent øverst
+def bar_chart(spec, total, highlighted, x_labels):
+    red = highlighted.T.ravel()
+    totals = total.T.ravel()
+
+    red_name, blue_name = spec['navne']
+    return go.Figure(
+        data=[
+            go.Bar(x=x_labels, y=red, name=red_name, marker_color=FARVER['rød'], showlegend=False),
+            go.Bar(x=x_labels, y=totals - red, name=blue_name, marker_color=FARVER['blå'], showlegend=False,
+                   text=_percent(red, totals), **PROCENT_TEKST),
+        ],
+        layout=dict(
+            SØJLE_LAYOUT,
+            title=f"{spec['titel']} - {spec['søjle_undertitel']}",
+            yaxis_title=spec['antal_titel'][0],
+        ),
+    )
+
+
+# Kurver: total på venstre akse og procent fremhævet på højre akse, P2 stiplet
+def line_chart(spec, total, highlighted, month_labels, start_years):
+    pct = _percent(highlighted, total)
+    p1, p2 = season_label(start_years[0]), season_label(start_years[1])
+
+    def line(y, name, color, width, dash=None, yaxis='y'):
+        return go.Scatter(x=month_labels, y=y, name=name, line=dict(color=color, width=width, dash=dash),
+                          mode='lines+markers', xaxis='x', yaxis=yaxis)
+
+    return go.Figure(
+        data=[
+            line(total[0], f"Total {p1}", FARVER['blå'], 3),
+            line(total[1], f"Total {p2}", FARVER['lyseblå'], 3, 'dash'),
+            line(pct[0], f"{spec['procent_navn']} {p1}", FARVER['rød'], 2, yaxis='y2'),
+            line(pct[1], f"{spec['procent_navn']} {p2}", FARVER['orange'], 2, 'dash', yaxis='y2'),
+        ],
+        layout=dict(
+            KURVE_LAYOUT,
+            title=spec['titel'],
+            xaxis=dict(anchor='y', domain=[0.0, 0.94], title_text="Måned"),
+            yaxis=dict(anchor='x', domain=[0.0, 1.0], title_text=spec['antal_titel'][1], rangemode='tozero'),
+            yaxis2=dict(anchor='x', overlaying='y', side='right', title_text=spec['procent_titel']),
+        ),
+    )
+
+
+# Markører (fx afvigelser) som ekstra punkter oven på en graf
+def add_markers(fig, markers):
+    for marker in markers:
+        fig.add_trace(go.Scatter(
+            x=marker['x'], y=marker['y'], mode='markers', name=marker['navn'],
+            marker=dict(symbol='diamond', size=13, color='#FFD700', line=dict(color='black', width=1.5)),
+            hovertext=marker['tekst'], hoverinfo='text'
+        ))
+    return fig
+
+
+# Funktion til at bygge en standardgraf som søjler eller kurver, inkl. markører
+def build_chart(spec, kind, total, highlighted, bar_labels, line_labels, start_years, markers=()):
+    if kind == 'søjler':
+        fig = bar_chart(spec, total, highlighted, bar_labels)
+    else:
+        fig = line_chart(spec, total, highlighted, line_labels, start_years)
+    return add_markers(fig, markers)
+
+
+# Fingeraftryk af alt en graf bygges af - arrays hashes på indhold, resten på repr
+def chart_fingerprint(*parts):
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            digest.update(f"{part.dtype}{part.shape}".encode())
+            digest.update(np.ascontiguousarray(part).tobytes())
+        else:
+            digest.update(repr(part).encode())
+    return digest.hexdigest()
+
+
+# Daglig udvikling: én linje pr. serie. I højvolumen-tilstand tegnes med WebGL
+# (Scattergl), og hver serie nedsamples med LTTB til plottets bredde i pixels.
+def daily_chart(title, dates, series, high_volume, width=PIXEL_BREDDE):
+    traces = []
+    for (name, values), color in zip(series.items(), [FARVER['blå'], FARVER['rød'], FARVER['orange'], FARVER['lyseblå']]):
+        if high_volume:
+            keep = lttb(values, width)
+            traces.append(go.Scattergl(x=dates[keep], y=values[keep], name=name, mode='lines',
+                                       line=dict(color=color, width=1.5)))
+        else:
+            traces.append(go.Scatter(x=dates, y=values, name=name, mode='lines+markers',
+                                     line=dict(color=color, width=1.5), marker=dict(size=4)))
+    return go.Figure(data=traces, layout=dict(DAGLIG_LAYOUT, title=title))
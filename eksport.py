@@ -0,0 +1,145 @@
+import zipfile
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from aggregater import ROLLUP_KOLONNER
+from diagrammer import GRAFER, chart_labels
+
+# pyarrow er valgfri - uden den kan der kun eksporteres til Excel
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Eksport af tallene bag graferne til BI-værktøjer: den månedlige rollup, grafernes
+# (graf x periode x måned) kube og P1/P2-sammenligningen. Tabellerne skrives i bidder
+# - Parquet/Arrow som record batches og Excel med openpyxl i write-only-tilstand -
+# så en stor rollup ikke skal bygges op som en hel projektmappe i hukommelsen.
+
+HAR_PYARROW = pa is not None
+
+# Rækker pr. bid (record batch / række-gruppe / append-runde)
+BID_RÆKKER = 100_000
+
+# Excel har højst 1.048.576 rækker pr. ark - længere tabeller fortsætter på et nyt ark
+EXCEL_MAKS_RÆKKER = 1_048_575
+
+
+# Funktion til at gøre rollup'en læsbar: år og måned i stedet for absolut månedsindeks
+def rollup_table(rollup):
+    months = rollup['Måned'].to_numpy().astype(np.int64)
+    return pd.DataFrame({
+        'År': months // 12,
+        'Måned': months % 12 + 1,
+        'Ydelseskode': rollup['Ydelseskode'].to_numpy(),
+        'Bruger': np.asarray(rollup['Bruger'], dtype=object).astype(str),
+        'Antal ydelser': rollup['Antal ydelser'].to_numpy().astype(np.int64),
+    }, columns=['År', 'Måned', 'Ydelseskode', 'Bruger', 'Antal ydelser'])
+
+
+# Funktion til at lave grafernes kube (lang form) og P1/P2-sammenligningen (bred form)
+# ud fra chart_aggregates()
+def aggregate_tables(aggregates, start_date_p1, duration_months, specs=GRAFER):
+    bar_labels, line_labels = chart_labels(start_date_p1, duration_months)
+    cube = []
+    comparison = []
+    for spec, (total, highlighted) in zip(specs, aggregates):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct = np.where(total > 0, highlighted / total * 100, np.nan)
+            change = np.where(total[0] > 0, (total[1] - total[0]) / total[0] * 100, np.nan)
+
+        for p, period in enumerate(['P1', 'P2']):
+            cube.append(pd.DataFrame({
+                'Graf': spec['titel'],
+                'Periode': period,
+                'Måned_nr': np.arange(1, duration_months + 1),
+                'Måned': bar_labels[p::2],
+                'Total': total[p],
+                'Fremhævet': highlighted[p],
+                'Procent fremhævet': pct[p].round(2),
+            }))
+
+        comparison.append(pd.DataFrame({
+            'Graf': spec['titel'],
+            'Måned': line_labels,
+            'Total P1': total[0],
+            'Fremhævet P1': highlighted[0],
+            'Procent P1': pct[0].round(2),
+            'Total P2': total[1],
+            'Fremhævet P2': highlighted[1],
+            'Procent P2': pct[1].round(2),
+            'Ændring total (%)': change.round(2),
+        }))
+
+    return pd.concat(cube, ignore_index=True), pd.concat(comparison, ignore_index=True)
+
+
+def _chunks(df):
+    for start in range(0, len(df), BID_RÆKKER):
+        yield df.iloc[start:start + BID_RÆKKER]
+
+
+# Funktion til at skrive tabellerne ({navn: DataFrame}) som en zip med én fil pr. tabel
+# i Parquet- eller Arrow IPC-format (.arrow). Filerne skrives bid for bid ind i zip'en.
+def write_arrow_zip(tables, out, format='parquet'):
+    if not HAR_PYARROW:
+        raise RuntimeError("Eksport til Parquet/Arrow kræver pyarrow (pip install pyarrow)")
+
+    suffix = '.parquet' if format == 'parquet' else '.arrow'
+    with zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_STORED) as zf:
+        for name, df in tables.items():
+            schema = pa.Schema.from_pandas(df.iloc[:0], preserve_index=False)
+            with zf.open(name + suffix, 'w', force_zip64=True) as entry:
+                if format == 'parquet':
+                    writer = pq.ParquetWriter(entry, schema, compression='zstd')
+                else:
+                    writer = pa.ipc.new_file(entry, schema)
+                with writer:
+                    for chunk in _chunks(df):
+                        writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+# Funktion til at skrive tabellerne ({navn: DataFrame}) som en Excel-projektmappe med ét
+# ark pr. tabel. Write-only-tilstand skriver rækkerne ud løbende i stedet for at holde
+# hele mappen som celler i hukommelsen.
+def write_excel(tables, out):
+    wb = Workbook(write_only=True)
+    bold = Font(bold=True)
+    for name, df in tables.items():
+        sheet = None
+        part = 0
+        rows = 0
+        for chunk in _chunks(df):
+            for row in chunk.itertuples(index=False, name=None):
+                if sheet is None or rows == EXCEL_MAKS_RÆKKER:
+                    part += 1
+                    sheet = wb.create_sheet(name if part == 1 else f"{name} ({part})")
+                    header = []
+                    for column in df.columns:
+                        cell = WriteOnlyCell(sheet, value=str(column))
+                        cell.font = bold
+                        header.append(cell)
+                    sheet.append(header)
+                    rows = 0
+                sheet.append([None if isinstance(value, float) and np.isnan(value) else value for value in row])
+                rows += 1
+        if sheet is None:
+            sheet = wb.create_sheet(name)
+            sheet.append([str(column) for column in df.columns])
+    wb.save(out)
+
+
+# Tabellerne i en samlet eksport
+def export_tables(rollup, aggregates, start_date_p1, duration_months):
+    cube, comparison = aggregate_tables(aggregates, start_date_p1, duration_months)
+    return {
+        'sammenligning': comparison,
+        'grafer': cube,
+        'rollup': rollup_table(rollup[ROLLUP_KOLONNER]),
+    }
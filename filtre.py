@@ -0,0 +1,100 @@
+from datetime import date, timedelta
+
+import numpy as np
+from dateutil.easter import easter
+
+from aggregater import month_indices
+from bitmapindeks import bitmap_for, invert
+
+# Filtre: hver betingelse (prædikat) er en tuple, som oversættes til et pakket
+# bitsæt over rækkerne (1 bit pr. række). Bitsættene kan caches pr. datasæt og
+# prædikat, så en ændret betingelse kun genberegner sit eget. Koder, brugere og
+# måneder slås op i bitmap-indekset; øvrige betingelser beregnes som maske og pakkes.
+# Et filterudtryk kombinerer bitsættene med OG/ELLER/IKKE som bit-operationer:
+#
+#   ('bruger', ('mp', 'jn'))         rækker for brugerne
+#   ('alder', 60, 120)               alder i intervallet (begge inkl.)
+#   ('koder', (121, 411))            ydelseskoderne
+#   ('måneder', (24242, 24243))      absolutte månedsindeks (år * 12 + måned - 1)
+#   ('køn', ('K',))                  køn
+#   ('helligdag',)                   danske helligdage
+#
+#   ('og', [udtryk, ...]), ('eller', [udtryk, ...]), ('ikke', udtryk)
+
+
+# Danske helligdage (og juleaften/grundlovsdag, hvor praksis typisk er lukket)
+def danish_holidays(years):
+    holidays = []
+    for year in years:
+        easter_day = easter(year)
+        holidays += [date(year, 1, 1), date(year, 6, 5), date(year, 12, 24), date(year, 12, 25), date(year, 12, 26)]
+        offsets = [-3, -2, 0, 1, 39, 49, 50]
+        if year < 2024:
+            offsets.append(26)  # Store bededag (afskaffet fra 2024)
+        holidays += [easter_day + timedelta(days=offset) for offset in offsets]
+    return np.array(sorted(holidays), dtype='datetime64[D]')
+
+
+# Maske for om værdierne i en kolonne er blandt de valgte. Kategoriske kolonner
+# slås op via kategorikoderne, så der kun sammenlignes én gang pr. kategori.
+def _isin(column, values):
+    if hasattr(column, 'cat'):
+        lookup = np.append(column.cat.categories.isin(values), False)
+        return lookup[column.cat.codes.to_numpy()]
+    return np.isin(column.to_numpy(), list(values))
+
+
+# Funktion til at beregne masken for ét prædikat
+def predicate_mask(df, predicate):
+    kind = predicate[0]
+    if kind == 'bruger':
+        return _isin(df['Bruger'], predicate[1])
+    if kind == 'koder':
+        return _isin(df['Ydelseskode'], predicate[1])
+    if kind == 'måneder':
+        return np.isin(month_indices(df['Ydelses dato']), list(predicate[1]))
+    if kind == 'køn':
+        return _isin(df['Køn'], predicate[1])
+    if kind == 'alder':
+        age = df['Alder'].to_numpy(dtype=np.float64, na_value=np.nan)
+        return (age >= predicate[1]) & (age <= predicate[2])
+    if kind == 'helligdag':
+        days = np.asarray(df['Ydelses dato'], dtype='datetime64[D]')
+        if len(days) == 0:
+            return np.zeros(0, dtype=bool)
+        years = range(days.min().astype(object).year, days.max().astype(object).year + 1)
+        return np.isin(days, danish_holidays(years))
+    raise ValueError(f"Ukendt filterbetingelse: {kind}")
+
+
+# Prædikater der kan slås op direkte i bitmap-indekset
+_INDEKSEREDE = {'bruger': 'bruger', 'koder': 'kode', 'måneder': 'måned'}
+
+
+# Funktion til at beregne det pakkede bitsæt for ét prædikat
+def predicate_bits(df, predicate, index=None):
+    if index is not None and predicate[0] in _INDEKSEREDE:
+        return bitmap_for(index, _INDEKSEREDE[predicate[0]], predicate[1])
+    return np.packbits(predicate_mask(df, predicate))
+
+
+# Prædikaterne i et udtryk (bladene i træet)
+def predicates(expression):
+    if expression[0] in ('og', 'eller'):
+        return [p for part in expression[1] for p in predicates(part)]
+    if expression[0] == 'ikke':
+        return predicates(expression[1])
+    return [expression]
+
+
+# Funktion til at evaluere et udtryk til et pakket bitsæt over rows rækker;
+# bits_for(prædikat) leverer (evt. cachede) bitsæt
+def evaluate(expression, bits_for, rows):
+    kind = expression[0]
+    if kind == 'og':
+        return np.bitwise_and.reduce([evaluate(part, bits_for, rows) for part in expression[1]])
+    if kind == 'eller':
+        return np.bitwise_or.reduce([evaluate(part, bits_for, rows) for part in expression[1]])
+    if kind == 'ikke':
+        return invert(evaluate(expression[1], bits_for, rows), rows)
+    return bits_for(expression)
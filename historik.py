@@ -0,0 +1,217 @@
+import sqlite3
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from aggregater import ROLLUP_KOLONNER, month_index, month_indices
+
+# Historik-database: al praksishistorik i en lokal SQLite-fil med indeks på
+# dato, kode og bruger samt en materialiseret månedlig rollup. Periodeforespørgsler
+# for P1/P2 går via indeks-range-scans på rollup-tabellen og returnerer kun
+# aggregerede rækker.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ydelser (
+    dato INTEGER NOT NULL,          -- dage siden 1970-01-01
+    maaned INTEGER NOT NULL,        -- år * 12 + måned - 1
+    ydelseskode INTEGER NOT NULL,
+    bruger TEXT NOT NULL,
+    antal REAL,
+    beloeb REAL,
+    alder INTEGER,
+    koen TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_ydelser_dato ON ydelser (dato);
+CREATE INDEX IF NOT EXISTS ix_ydelser_kode ON ydelser (ydelseskode, dato);
+CREATE INDEX IF NOT EXISTS ix_ydelser_bruger ON ydelser (bruger, dato);
+
+CREATE TABLE IF NOT EXISTS maaned_rollup (
+    maaned INTEGER NOT NULL,
+    ydelseskode INTEGER NOT NULL,
+    bruger TEXT NOT NULL,
+    antal_ydelser INTEGER NOT NULL,
+    PRIMARY KEY (maaned, ydelseskode, bruger)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS importer (
+    kilde TEXT NOT NULL,
+    importeret TEXT NOT NULL,
+    fra_dato INTEGER NOT NULL,
+    til_dato INTEGER NOT NULL,
+    raekker INTEGER NOT NULL
+);
+"""
+
+
+# Forbindelser pr. tråd - se thread_connection()
+_tråde = threading.local()
+
+
+# Funktion til at åbne (og om nødvendigt oprette) databasen
+def connect(path, read_only=False):
+    if read_only:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    else:
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+    return conn
+
+
+# Funktion til at hente trådens egen forbindelse. En sqlite3-forbindelse kan ikke deles
+# af tråde, der kører transaktioner samtidig, så hver session og hver af rapportkøens
+# tråde får sin egen - WAL lader dem læse, mens en anden skriver.
+def thread_connection(path, read_only=False):
+    connections = _tråde.__dict__.setdefault('forbindelser', {})
+    key = (str(path), read_only)
+    if key not in connections:
+        connections[key] = connect(path, read_only)
+    return connections[key]
+
+
+def _optional(df, column, dtype):
+    if column not in df.columns:
+        return [None] * len(df)
+    values = df[column].to_numpy(dtype=object)
+    return [None if pd.isna(v) else dtype(v) for v in values]
+
+
+# Funktion til at importere en renset eksport. Rækker, der allerede findes (samme dato,
+# kode, bruger og værdier), springes over, så overlappende eksporter ikke giver dubletter,
+# og en delvis eksport ikke sletter noget. Står en række n gange i eksporten, gemmes den
+# kun så mange gange, som den mangler i databasen. Returnerer antal nye rækker.
+def import_export(conn, df, source_name):
+    if len(df) == 0:
+        return 0
+
+    days = np.asarray(df['Ydelses dato'], dtype='datetime64[D]').astype('int64')
+    months = month_indices(df['Ydelses dato'])
+    first_day, last_day = int(days.min()), int(days.max())
+    first_month, last_month = int(months.min()), int(months.max())
+
+    rows = zip(
+        days.tolist(),
+        months.tolist(),
+        df['Ydelseskode'].astype('int64').tolist(),
+        df['Bruger'].astype(str).tolist(),
+        _optional(df, 'Antal', float),
+        _optional(df, 'Beløb', float),
+        _optional(df, 'Alder', int),
+        _optional(df, 'Køn', str),
+    )
+
+    with conn:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS ny_import AS SELECT * FROM ydelser WHERE 0")
+        conn.execute("DELETE FROM ny_import")
+        conn.executemany(
+            "INSERT INTO ny_import (dato, maaned, ydelseskode, bruger, antal, beloeb, alder, koen) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        # Kode/dato-indekset rammer få rækker pr. opslag - bruger/dato-indekset rammer mange
+        inserted = conn.execute(
+            "INSERT INTO ydelser (dato, maaned, ydelseskode, bruger, antal, beloeb, alder, koen) "
+            "SELECT dato, maaned, ydelseskode, bruger, antal, beloeb, alder, koen FROM ("
+            "  SELECT *, ROW_NUMBER() OVER ("
+            "    PARTITION BY dato, ydelseskode, bruger, antal, beloeb, alder, koen) AS nr FROM ny_import"
+            ") AS n WHERE nr > ("
+            "  SELECT COUNT(*) FROM ydelser AS y INDEXED BY ix_ydelser_kode WHERE y.ydelseskode = n.ydelseskode AND y.dato = n.dato"
+            "  AND y.bruger = n.bruger AND y.antal IS n.antal AND y.beloeb IS n.beloeb"
+            "  AND y.alder IS n.alder AND y.koen IS n.koen)"
+        ).rowcount
+        conn.execute("DELETE FROM ny_import")
+
+        # Genberegn rollup for de berørte måneder
+        conn.execute("DELETE FROM maaned_rollup WHERE maaned BETWEEN ? AND ?", (first_month, last_month))
+        conn.execute(
+            "INSERT INTO maaned_rollup (maaned, ydelseskode, bruger, antal_ydelser) "
+            "SELECT maaned, ydelseskode, bruger, COUNT(*) FROM ydelser "
+            "WHERE maaned BETWEEN ? AND ? GROUP BY maaned, ydelseskode, bruger",
+            (first_month, last_month),
+        )
+        conn.execute(
+            "INSERT INTO importer (kilde, importeret, fra_dato, til_dato, raekker) VALUES (?, ?, ?, ?, ?)",
+            (source_name, datetime.now().isoformat(timespec='seconds'), first_day, last_day, inserted),
+        )
+
+    return inserted
+
+
+# Rollup-rækker som DataFrame - heltalskolonnerne får int64, også når der ingen rækker er
+def _rollup_frame(rows):
+    return pd.DataFrame(rows, columns=ROLLUP_KOLONNER).astype(
+        {'Måned': 'int64', 'Ydelseskode': 'int64', 'Antal ydelser': 'int64'}
+    )
+
+
+# Funktion til at hente rollup for en periode (kun aggregerede rækker)
+def query_period_rollup(conn, start_date, duration_months):
+    start = month_index(start_date)
+    cursor = conn.execute(
+        "SELECT maaned, ydelseskode, bruger, antal_ydelser FROM maaned_rollup "
+        "WHERE maaned >= ? AND maaned < ?",
+        (start, start + duration_months),
+    )
+    period = _rollup_frame(cursor.fetchall())
+    period['Måned_nr'] = period['Måned'] - start + 1
+    return period
+
+
+# Funktion til at hente hele den månedlige rollup (fx til batchrapporter)
+def query_monthly_rollup(conn):
+    cursor = conn.execute("SELECT maaned, ydelseskode, bruger, antal_ydelser FROM maaned_rollup")
+    return _rollup_frame(cursor.fetchall())
+
+
+# Funktion til at hente hele den månedlige rollup pr. kode (uden brugere)
+def query_code_rollup(conn):
+    cursor = conn.execute(
+        "SELECT maaned, ydelseskode, SUM(antal_ydelser) FROM maaned_rollup GROUP BY maaned, ydelseskode"
+    )
+    return pd.DataFrame(cursor.fetchall(), columns=['Måned', 'Ydelseskode', 'Antal ydelser'])
+
+
+# Funktion til at hente antal pr. (dag, kode) - aggregeres i databasen via kode/dato-indekset
+def query_daily_code_counts(conn):
+    cursor = conn.execute("SELECT dato, ydelseskode, COUNT(*) FROM ydelser GROUP BY ydelseskode, dato")
+    counts = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 3)
+    return counts[:, 0], counts[:, 1], counts[:, 2]
+
+
+# År der findes data for
+def available_years(conn):
+    cursor = conn.execute("SELECT DISTINCT maaned / 12 FROM maaned_rollup ORDER BY 1")
+    return [row[0] for row in cursor.fetchall()]
+
+
+# Version der ændres ved hver import - bruges som cache-nøgle sammen med databasens sti.
+# Seneste imports id og tidspunkt samt antal ydelser skelner også en genskabt database.
+def history_version(conn):
+    last_import = conn.execute(
+        "SELECT rowid, importeret, raekker FROM importer ORDER BY rowid DESC LIMIT 1"
+    ).fetchone()
+    if last_import is None:
+        return "tom"
+    rowid, imported_at, rows = last_import
+    return f"{rowid}:{imported_at}:{rows}:{total_services(conn)}"
+
+
+# Samlet antal ydelser i databasen (fra rollup'en - uden at scanne rækkerne)
+def total_services(conn):
+    return conn.execute("SELECT COALESCE(SUM(antal_ydelser), 0) FROM maaned_rollup").fetchone()[0]
+
+
+# Funktion til at hente rækkedata for et datointerval - kun når brugeren beder om det
+def query_rows(conn, start_date, end_date, limit=10_000):
+    epoch = datetime(1970, 1, 1)
+    cursor = conn.execute(
+        "SELECT dato, ydelseskode, bruger, antal, beloeb, alder, koen FROM ydelser "
+        "WHERE dato BETWEEN ? AND ? ORDER BY dato LIMIT ?",
+        ((start_date - epoch).days, (end_date - epoch).days, limit),
+    )
+    rows = pd.DataFrame(cursor.fetchall(),
+                        columns=['Ydelses dato', 'Ydelseskode', 'Bruger', 'Antal', 'Beløb', 'Alder', 'Køn'])
+    rows['Ydelses dato'] = pd.to_datetime(rows['Ydelses dato'], unit='D')
+    return rows
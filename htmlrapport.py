@@ -0,0 +1,76 @@
+import html
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from plotly.offline import get_plotlyjs
+
+from diagrammer import season_label
+
+# Interaktiv rapport som én HTML-fil, der kan åbnes uden net: plotly.js lægges ind
+# i filen, og graferne tegnes i browseren fra figurernes JSON - den samme JSON som
+# allerede er cachet til dashboardet - så der ikke skal renderes billeder.
+
+_STIL = """
+body { font-family: Helvetica, Arial, sans-serif; margin: 2em; color: #262730; }
+h1 { font-size: 1.6em; }
+.graf { margin-top: 2em; }
+table { border-collapse: collapse; font-size: 0.85em; margin-top: 0.5em; }
+th, td { border: 1px solid #E5ECF6; padding: 0.3em 0.8em; text-align: right; }
+th:first-child, td:first-child { text-align: left; }
+tr:last-child td { font-weight: bold; }
+"""
+
+
+# plotly.js (ca. 4,5 MB) læses én gang pr. proces
+@lru_cache(maxsize=1)
+def _plotly_js():
+    return get_plotlyjs()
+
+
+# Funktion til at lave en oversigt over en graf: total og procent fremhævet pr. måned
+# for P1 og P2 samt en række med hele perioden
+def summary_table(spec, total, highlighted, month_labels, start_years):
+    p1, p2 = season_label(start_years[0]), season_label(start_years[1])
+    totals = np.column_stack([total, total.sum(axis=1)])
+    highlighted = np.column_stack([highlighted, highlighted.sum(axis=1)])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = np.where(totals > 0, highlighted / totals * 100, 0)
+
+    return pd.DataFrame({
+        'Måned': list(month_labels) + ['I alt'],
+        f"Total {p1}": totals[0],
+        f"{spec['procent_navn']} {p1}": [f"{p:.1f}%" for p in pct[0]],
+        f"Total {p2}": totals[1],
+        f"{spec['procent_navn']} {p2}": [f"{p:.1f}%" for p in pct[1]],
+    })
+
+
+# Funktion til at skrive rapporten til en binær fil. figure_jsons er figurernes JSON
+# (fig.to_json()), tables en oversigt (DataFrame eller None) pr. figur, og header er
+# (titel, linjer) øverst på siden.
+def write_html_report(figure_jsons, tables, header, out):
+    title, lines = header
+
+    def write(text):
+        out.write(text.encode('utf-8'))
+
+    write(f'<!DOCTYPE html>\n<html lang="da">\n<head>\n<meta charset="utf-8">\n'
+          f'<title>{html.escape(title)}</title>\n<style>{_STIL}</style>\n<script>')
+    write(_plotly_js())
+    write('</script>\n</head>\n<body>\n')
+    write(f'<h1>{html.escape(title)}</h1>\n')
+    for line in lines:
+        write(f'<p>{html.escape(line)}</p>\n')
+
+    for i, (figure_json, table) in enumerate(zip(figure_jsons, tables), 1):
+        # "</" må ikke stå i et script-element
+        figure_json = figure_json.replace('</', '<\\/')
+        write(f'<div class="graf" id="graf{i}"></div>\n<script>\n'
+              f'(function () {{ var fig = {figure_json};\n'
+              f'Plotly.newPlot("graf{i}", fig.data, fig.layout, {{responsive: true}}); }})();\n</script>\n')
+        if table is not None:
+            write(table.to_html(index=False, border=0))
+            write('\n')
+
+    write('</body>\n</html>\n')
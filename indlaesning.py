@@ -0,0 +1,82 @@
+import io
+import threading
+
+import pandas as pd
+
+from datoer import normalize_dates
+from validering import validate
+
+# Kolonner i eksporten fra lægesystemet
+KOLONNER = ['Køn', 'Alder', 'Ydelseskode', 'Antal', 'Beløb', 'Ydelses dato', 'Bruger']
+
+
+# Funktion til at rense en rå eksport - returnerer gyldige rækker og karantæne
+def clean_export(raw):
+    # Konverter dato til datetime (Excel-serienumre, kendte tekstformater eller blandet)
+    dates = normalize_dates(raw['Ydelses dato']) if 'Ydelses dato' in raw.columns else None
+
+    # Valider alle regler på én gang - kun rækker med Antal >= 1 og gyldige felter medtages
+    return validate(raw, dates)
+
+
+# Funktion til at indlæse og rense en eksport (Excel-fil eller uploadet fil)
+def load_export(source):
+    # Indlæs data
+    raw = pd.read_excel(source)
+
+    return clean_export(raw)
+
+
+# Funktion til at læse første ark af en .xlsx-fil i bidder med løbende fremdrift (0-1)
+def read_excel_with_progress(source, progress=None, chunk_rows=50_000):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        total = max((ws.max_row or 1) - 1, 1)
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, ())
+
+        chunks = []
+        buffer = []
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= chunk_rows:
+                chunks.append(pd.DataFrame(buffer, columns=header))
+                buffer = []
+                if progress:
+                    progress(min(len(chunks) * chunk_rows / total, 1.0))
+        chunks.append(pd.DataFrame(buffer, columns=header))
+    finally:
+        wb.close()
+
+    raw = pd.concat(chunks, ignore_index=True).dropna(how='all').infer_objects()
+    if progress:
+        progress(1.0)
+    return raw
+
+
+# Funktion til hurtig forhåndsvisning: kun de første rækker læses og renses
+def load_preview(data, rows=20_000):
+    raw = pd.read_excel(io.BytesIO(data), nrows=rows)
+    return clean_export(raw)
+
+
+# Funktion til at starte fuld indlæsning i en baggrundstråd - status opdateres i job-dict'en
+def start_background_load(data, job_id):
+    job = {'id': job_id, 'fremdrift': 0.0, 'resultat': None, 'fejl': None}
+
+    def progress(fraction):
+        job['fremdrift'] = fraction
+
+    def run():
+        try:
+            raw = read_excel_with_progress(io.BytesIO(data), progress)
+            job['resultat'] = clean_export(raw)
+        except Exception as e:
+            job['fejl'] = e
+
+    job['tråd'] = threading.Thread(target=run, name=f"indlaesning-{job_id[:8]}", daemon=True)
+    job['tråd'].start()
+    return job
@@ -0,0 +1,88 @@
+import numpy as np
+
+# Kodehierarki: gruppe -> undergruppe -> ydelseskoder. Undergrupperne svarer
+# til farverne i graferne (rød/blå del af søjlerne).
+KODEHIERARKI = {
+    'Grundydelser': {
+        'Kode 120': [120],
+        'Kode 101 + 125': [101, 125],
+    },
+    'Besøg': {
+        'Kode 121': [121],
+        'Øvrige besøg': [411, 421, 431, 441, 491],
+    },
+}
+
+ROD = 'Alle grupper'
+
+
+# Koderne i hierarkiets rækkefølge + start-indeks for hver undergruppe og gruppe,
+# så niveauerne kan summeres med np.add.reduceat
+def flatten(hierarchy=KODEHIERARKI):
+    codes = []
+    subgroup_starts = []
+    group_starts = []
+    paths = []
+    for group, subgroups in hierarchy.items():
+        group_starts.append(len(subgroup_starts))
+        for subgroup, subgroup_codes in subgroups.items():
+            subgroup_starts.append(len(codes))
+            paths.append((group, subgroup))
+            codes.extend(subgroup_codes)
+    return np.array(codes), np.array(subgroup_starts), np.array(group_starts), paths
+
+
+# Funktion til at forudberegne antal pr. (periode, måned) på alle niveauer i ét gennemløb.
+# periods er en liste af periode-rollups (fx [df_p1, df_p2]) med Måned_nr 1..duration.
+def aggregate_hierarchy(periods, duration_months, hierarchy=KODEHIERARKI):
+    codes, subgroup_starts, group_starts, paths = flatten(hierarchy)
+    order = np.argsort(codes)
+    n_codes, n_periods = len(codes), len(periods)
+
+    # Ét samlet bincount over (periode, kode, måned)
+    index_parts = []
+    weight_parts = []
+    for p, period in enumerate(periods):
+        period_codes = period['Ydelseskode'].to_numpy()
+        pos = np.searchsorted(codes, period_codes, sorter=order).clip(0, n_codes - 1)
+        code_idx = order[pos]
+        known = codes[code_idx] == period_codes
+        month_idx = period['Måned_nr'].to_numpy() - 1
+        index_parts.append(((p * n_codes + code_idx) * duration_months + month_idx)[known])
+        weight_parts.append(period['Antal ydelser'].to_numpy()[known])
+
+    counts = np.bincount(
+        np.concatenate(index_parts).astype(np.int64),
+        weights=np.concatenate(weight_parts),
+        minlength=n_periods * n_codes * duration_months,
+    ).reshape(n_periods, n_codes, duration_months)
+
+    # Summer op gennem niveauerne: kode -> undergruppe -> gruppe -> rod
+    subgroup_counts = np.add.reduceat(counts, subgroup_starts, axis=1)
+    group_counts = np.add.reduceat(subgroup_counts, group_starts, axis=1)
+
+    aggregates = {(): group_counts.sum(axis=1)}
+    for g, group in enumerate(hierarchy):
+        aggregates[(group,)] = group_counts[:, g]
+    for s, (group, subgroup) in enumerate(paths):
+        aggregates[(group, subgroup)] = subgroup_counts[:, s]
+        for c in range(subgroup_starts[s], subgroup_starts[s] + len(hierarchy[group][subgroup])):
+            aggregates[(group, subgroup, str(codes[c]))] = counts[:, c]
+
+    return aggregates
+
+
+# Børn af en node i hierarkiet (tom liste for en enkelt kode)
+def children(path, hierarchy=KODEHIERARKI):
+    if len(path) == 0:
+        return list(hierarchy)
+    if len(path) == 1:
+        return list(hierarchy[path[0]])
+    if len(path) == 2:
+        return [str(code) for code in hierarchy[path[0]][path[1]]]
+    return []
+
+
+# Navn til visning af en node
+def node_label(path):
+    return ROD if len(path) == 0 else (f"Kode {path[-1]}" if len(path) == 3 else path[-1])
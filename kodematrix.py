@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+# Kode x måned-matrix for hele kodekataloget: beregnes med ét np.bincount over
+# den kategoriske kodekolonne og det absolutte månedsindeks.
+
+
+# Funktion til at bygge en tæt (koder x måneder) matrix ud fra en månedlig rollup
+def code_month_matrix(rollup):
+    if len(rollup) == 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.zeros((0, 0), dtype=np.int64)
+
+    codes, code_idx = np.unique(rollup['Ydelseskode'].to_numpy(), return_inverse=True)
+    month_values = rollup['Måned'].to_numpy()
+    first_month, last_month = int(month_values.min()), int(month_values.max())
+    months = np.arange(first_month, last_month + 1)
+    n_months = len(months)
+
+    matrix = np.bincount(
+        code_idx * n_months + (month_values - first_month),
+        weights=rollup['Antal ydelser'].to_numpy(),
+        minlength=len(codes) * n_months,
+    ).reshape(len(codes), n_months).astype(np.int64)
+
+    return codes, months, matrix
+
+
+# Ændring i forhold til samme måned året før (NaN hvor der ikke er et år før)
+def year_over_year(matrix):
+    delta = np.full(matrix.shape, np.nan)
+    pct = np.full(matrix.shape, np.nan)
+    if matrix.shape[1] > 12:
+        current, previous = matrix[:, 12:], matrix[:, :-12]
+        delta[:, 12:] = current - previous
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct[:, 12:] = np.where(previous > 0, (current - previous) / previous * 100, np.nan)
+    return delta, pct
+
+
+# Funktion til at lave top-koder-tabel for de sidste 12 måneder mod de 12 før
+def top_codes(codes, months, matrix, top_n=None):
+    last_12 = matrix[:, -12:].sum(axis=1)
+    previous_12 = matrix[:, -24:-12].sum(axis=1) if matrix.shape[1] >= 24 else np.zeros(len(codes), dtype=np.int64)
+    total = last_12.sum()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        table = pd.DataFrame({
+            'Ydelseskode': codes,
+            'Sidste 12 mdr.': last_12,
+            'Andel (%)': np.round(last_12 / total * 100, 1) if total else 0.0,
+            '12 mdr. før': previous_12,
+            'Ændring': last_12 - previous_12,
+            'Ændring (%)': np.round(np.where(previous_12 > 0, (last_12 - previous_12) / previous_12 * 100, np.nan), 1),
+        })
+
+    table = table.sort_values('Sidste 12 mdr.', ascending=False, kind='stable').reset_index(drop=True)
+    return table.head(top_n) if top_n else table
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from indlaesning import load_export
+from bitmapindeks import INDEKS_KOLONNER, build_bitmap_index
+
+# Kolonnelager: hver eksport konverteres én gang til en mappe med en .npy-fil
+# pr. kolonne og et lille manifest. Filerne åbnes memory-mapped, så alle
+# sessioner og processer deler de samme sider via OS'ets page cache.
+# Bitmap-indekset for koder, brugere og måneder bygges samtidig og gemmes ved siden af.
+
+LAGER_VERSION = 3
+MANIFEST_NAVN = 'manifest.json'
+KARANTÆNE_MAPPE = 'karantaene'
+EKSPORT_ENDELSER = ('.xlsx', '.xls')
+
+
+# Fingeraftryk af en eksportfil (størrelse + ændringstid) - ændres filen, laves et nyt lager
+def _source_fingerprint(path):
+    stat = os.stat(path)
+    key = f"{LAGER_VERSION}:{stat.st_size}:{stat.st_mtime_ns}"
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+
+# Funktion til at omsætte en DataFrame til kompakte numpy-kolonner + beskrivelser
+def encode_columns(df):
+    entries = []
+    arrays = []
+    for name in df.columns:
+        s = df[name]
+        entry = {'navn': str(name)}
+
+        if pd.api.types.is_datetime64_any_dtype(s):
+            arr = s.to_numpy(dtype='datetime64[ns]')
+            entry['type'] = 'dato'
+        elif pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+            arr = s.to_numpy()
+            entry['type'] = 'tal'
+        else:
+            # Tekst gemmes som kategori-koder + liste af kategorier i manifestet
+            cat = s.astype(str).where(s.notna()).astype('category')
+            arr = cat.cat.codes.to_numpy()
+            entry['type'] = 'kategori'
+            entry['kategorier'] = [str(c) for c in cat.cat.categories]
+
+        entry['dtype'] = str(arr.dtype)
+        entries.append(entry)
+        arrays.append(np.ascontiguousarray(arr))
+
+    return entries, arrays
+
+
+# Funktion til at samle kolonner til en DataFrame uden at kopiere data
+def decode_columns(entries, arrays):
+    data = {}
+    for entry, arr in zip(entries, arrays):
+        if entry['type'] == 'kategori':
+            data[entry['navn']] = pd.Categorical.from_codes(arr, entry['kategorier'])
+        else:
+            data[entry['navn']] = arr
+
+    return pd.DataFrame(data, copy=False)
+
+
+# Funktion til at skrive en renset DataFrame som kolonnelager
+def write_column_store(df, store_dir, source_info=None, quarantine=None, bitmaps=True):
+    store_dir = Path(store_dir)
+    tmp_dir = store_dir.with_name(f"{store_dir.name}.tmp-{os.getpid()}")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    columns, arrays = encode_columns(df)
+    for i, (entry, arr) in enumerate(zip(columns, arrays)):
+        entry['fil'] = f"kol{i:02d}.npy"
+        np.save(tmp_dir / entry['fil'], arr, allow_pickle=False)
+
+    # Karantæne-rækker gemmes som et lille lager i en undermappe
+    if quarantine is not None:
+        write_column_store(quarantine, tmp_dir / KARANTÆNE_MAPPE, bitmaps=False)
+
+    manifest = {
+        'version': LAGER_VERSION,
+        'rækker': int(len(df)),
+        'kolonner': columns,
+        'kilde': source_info or {},
+    }
+
+    if bitmaps:
+        index = build_bitmap_index(df)
+        manifest['bitmaps'] = {}
+        for kind in INDEKS_KOLONNER:
+            values, kind_bitmaps = index[kind]
+            entry = {'fil': f"bitmap_{kind}.npy", 'værdier': values.tolist()}
+            np.save(tmp_dir / entry['fil'], kind_bitmaps, allow_pickle=False)
+            manifest['bitmaps'][kind] = entry
+    with open(tmp_dir / MANIFEST_NAVN, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    # Atomisk udskiftning - en anden proces kan have konverteret samme fil imens
+    try:
+        os.rename(tmp_dir, store_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not (store_dir / MANIFEST_NAVN).exists():
+            raise
+
+    return manifest
+
+
+# Funktion til at læse manifestet for et lager
+def read_manifest(store_dir):
+    with open(Path(store_dir) / MANIFEST_NAVN, encoding='utf-8') as f:
+        return json.load(f)
+
+
+# Funktion til at åbne et kolonnelager som DataFrame uden at kopiere data
+def open_column_store(store_dir):
+    store_dir = Path(store_dir)
+    manifest = read_manifest(store_dir)
+
+    arrays = [np.load(store_dir / entry['fil'], mmap_mode='r') for entry in manifest['kolonner']]
+    return decode_columns(manifest['kolonner'], arrays)
+
+
+# Funktion til at åbne bitmap-indekset for et lager (None hvis lageret ikke har et)
+def open_bitmap_index(store_dir):
+    store_dir = Path(store_dir)
+    manifest = read_manifest(store_dir)
+    if 'bitmaps' not in manifest:
+        return None
+
+    index = {'rækker': manifest['rækker']}
+    for kind, entry in manifest['bitmaps'].items():
+        index[kind] = (np.array(entry['værdier']), np.load(store_dir / entry['fil'], mmap_mode='r'))
+    return index
+
+
+# Funktion til at åbne karantæne-rækkerne for et lager (tom hvis ingen)
+def open_quarantine(store_dir):
+    quarantine_dir = Path(store_dir) / KARANTÆNE_MAPPE
+    if not (quarantine_dir / MANIFEST_NAVN).exists():
+        return pd.DataFrame()
+    return open_column_store(quarantine_dir)
+
+
+# Funktion til at finde eksporter i en mappe og konvertere nye/ændrede filer én gang
+def sync_export_folder(export_dir, store_root=None):
+    export_dir = Path(export_dir)
+    store_root = Path(store_root) if store_root else export_dir / '.kolonnelager'
+    store_root.mkdir(parents=True, exist_ok=True)
+
+    stores = {}
+    for path in sorted(export_dir.iterdir()):
+        if path.suffix.lower() not in EKSPORT_ENDELSER or path.name.startswith('~$'):
+            continue
+
+        # Filnavnet med endelse - x.xls og x.xlsx får hver sit lager
+        store_dir = store_root / f"{path.name}-{_source_fingerprint(path)}"
+        if not (store_dir / MANIFEST_NAVN).exists():
+            df, quarantine = load_export(path)
+            source_info = {'fil': path.name, 'størrelse': path.stat().st_size}
+            write_column_store(df, store_dir, source_info, quarantine)
+
+            # Ryd op i lagre fra tidligere versioner af samme fil (kildefilen står i manifestet)
+            for old in store_root.iterdir():
+                if old == store_dir or '.tmp-' in old.name or not (old / MANIFEST_NAVN).exists():
+                    continue
+                if read_manifest(old)['kilde'].get('fil') == path.name:
+                    shutil.rmtree(old, ignore_errors=True)
+
+        stores[path.name] = store_dir
+
+    return stores
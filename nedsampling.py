@@ -0,0 +1,36 @@
+import numpy as np
+
+# Nedsampling af lange serier til ca. ét punkt pr. pixel med
+# largest-triangle-three-buckets (LTTB): punkterne deles i spande, og fra hver spand
+# vælges det punkt, der danner den største trekant med det forrige valgte punkt og
+# gennemsnittet af næste spand. Toppe og dale bevares, så kurven ser ens ud.
+
+PIXEL_BREDDE = 1200
+
+
+# Funktion til at vælge n_out indeks fra en serie (første og sidste punkt er altid med)
+def lttb(y, n_out, x=None):
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+
+    # n_out - 2 spande over punkterne mellem første og sidste
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start = end
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
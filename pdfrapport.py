@@ -0,0 +1,245 @@
+import hashlib
+import io
+from pathlib import Path
+
+import numpy as np
+from reportlab.graphics import renderPDF
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.legends import Legend
+from reportlab.graphics.charts.linecharts import HorizontalLineChart
+from reportlab.graphics.shapes import Drawing, Group, String
+from reportlab.graphics.widgets.markers import makeMarker
+from reportlab.lib.colors import HexColor
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from diagrammer import FARVER, GRAFER, season_label
+
+# PDF-rapport med vektorgrafer: søjler, procenter og kurver tegnes direkte med
+# reportlab.graphics ud fra de samme (periode x måned) arrays som Plotly-graferne,
+# uden en browser til at rendere billeder. Siderne svarer til den tidligere rapport,
+# og Kaleido-billeder kan stadig lægges på de samme pladser.
+
+# Hæves når rapportens indhold eller layout ændres, så cachede rapporter ikke genbruges
+RAPPORT_VERSION = 1
+
+GRAF_BREDDE = 700
+GRAF_HØJDE = 250
+
+# Kvalitetsprofiler til billedgrafer: opløsning i den størrelse grafen får på siden,
+# og billedformat. JPEG giver små filer til skærm; PNG holder streger og tekst skarpe.
+KVALITETER = {
+    'Skærm': {'dpi': 96, 'format': 'jpeg', 'jpeg_kvalitet': 80},
+    'Tryk': {'dpi': 200, 'format': 'png'},
+    'Arkiv': {'dpi': 300, 'format': 'png'},
+}
+# Den lette profil er standard - tryk- og arkivkvalitet vælges til
+STANDARD_KVALITET = 'Skærm'
+
+# Plotly-figurernes layoutstørrelse i CSS-pixels - billedets opløsning styres med scale
+BILLED_BREDDE = 1200
+BILLED_HØJDE = 500
+
+_FARVER = {name: HexColor(color) for name, color in FARVER.items()}
+
+
+def _title(drawing, text):
+    drawing.add(String(0, GRAF_HØJDE - 12, text, fontName='Helvetica-Bold', fontSize=10))
+
+
+def _y_title(drawing, text, x, anchor='middle'):
+    label = String(0, 0, text, fontName='Helvetica', fontSize=8, textAnchor=anchor)
+    drawing.add(Group(label, transform=(0, 1, -1, 0, x, GRAF_HØJDE / 2 - 10)))
+
+
+# Søjler: P1 og P2 side om side for hver måned, rød fremhævet del nederst og procent øverst
+def bar_drawing(spec, total, highlighted, x_labels):
+    red = highlighted.T.ravel()
+    totals = total.T.ravel()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = np.where(totals > 0, red / totals * 100, 0)
+
+    drawing = Drawing(GRAF_BREDDE, GRAF_HØJDE)
+    chart = VerticalBarChart()
+    chart.x, chart.y = 50, 45
+    chart.width, chart.height = GRAF_BREDDE - 70, GRAF_HØJDE - 85
+    chart.data = [red.tolist(), (totals - red).tolist()]
+    chart.categoryAxis.style = 'stacked'
+    chart.categoryAxis.categoryNames = list(x_labels)
+    chart.categoryAxis.labels.angle = 45
+    chart.categoryAxis.labels.boxAnchor = 'ne'
+    chart.categoryAxis.labels.fontSize = 7
+    chart.categoryAxis.labels.fontName = 'Helvetica'
+    chart.valueAxis.valueMin = 0
+    chart.valueAxis.labels.fontSize = 7
+    chart.valueAxis.labels.fontName = 'Helvetica'
+    chart.valueAxis.visibleGrid = True
+    chart.valueAxis.gridStrokeColor = HexColor('#E5ECF6')
+    chart.bars.strokeColor = None
+    chart.bars[0].fillColor = _FARVER['rød']
+    chart.bars[1].fillColor = _FARVER['blå']
+
+    # Procent over stakken - som label på den øverste serie
+    chart.barLabelFormat = [None, 'values']
+    chart.barLabelArray = [[''] * len(totals), [f"{p:.0f}%" for p in pct]]
+    chart.barLabels.boxAnchor = 's'
+    chart.barLabels.dy = 3
+    chart.barLabels.fontName = 'Helvetica-Bold'
+    chart.barLabels.fontSize = 7
+    chart.barLabels.fillColor = _FARVER['rød']
+
+    drawing.add(chart)
+    _title(drawing, f"{spec['titel']} - {spec['søjle_undertitel']}")
+    _y_title(drawing, spec['antal_titel'][0], 15)
+    return drawing
+
+
+def _line_chart(data, month_labels, styles):
+    chart = HorizontalLineChart()
+    chart.x, chart.y = 50, 35
+    chart.width, chart.height = GRAF_BREDDE - 110, GRAF_HØJDE - 85
+    chart.data = data
+    chart.joinedLines = 1
+    chart.categoryAxis.categoryNames = list(month_labels)
+    chart.categoryAxis.labels.fontSize = 7
+    chart.categoryAxis.labels.fontName = 'Helvetica'
+    chart.valueAxis.labels.fontSize = 7
+    chart.valueAxis.labels.fontName = 'Helvetica'
+    for i, (color, width, dashed) in enumerate(styles):
+        chart.lines[i].strokeColor = color
+        chart.lines[i].strokeWidth = width
+        chart.lines[i].symbol = makeMarker('FilledCircle', size=3, fillColor=color, strokeColor=color)
+        if dashed:
+            chart.lines[i].strokeDashArray = (4, 3)
+    return chart
+
+
+# Kurver: total på venstre akse og procent fremhævet på højre akse, P2 stiplet
+def line_drawing(spec, total, highlighted, month_labels, start_years):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = np.where(total > 0, highlighted / total * 100, 0)
+    p1, p2 = season_label(start_years[0]), season_label(start_years[1])
+
+    drawing = Drawing(GRAF_BREDDE, GRAF_HØJDE)
+
+    totals = _line_chart([total[0].tolist(), total[1].tolist()], month_labels,
+                         [(_FARVER['blå'], 2, False), (_FARVER['lyseblå'], 2, True)])
+    totals.valueAxis.valueMin = 0
+    totals.valueAxis.visibleGrid = True
+    totals.valueAxis.gridStrokeColor = HexColor('#E5ECF6')
+    drawing.add(totals)
+
+    # Procent på en højre akse - samme plotområde, egen værdiakse
+    percent = _line_chart([pct[0].tolist(), pct[1].tolist()], month_labels,
+                          [(_FARVER['rød'], 1.5, False), (_FARVER['orange'], 1.5, True)])
+    percent.categoryAxis.visible = 0
+    percent.valueAxis.joinAxis = percent.categoryAxis
+    percent.valueAxis.joinAxisMode = 'right'
+    percent.valueAxis.labels.boxAnchor = 'w'
+    percent.valueAxis.labels.dx = 6
+    drawing.add(percent)
+
+    legend = Legend()
+    legend.x, legend.y = 50, GRAF_HØJDE - 28
+    legend.alignment = 'right'
+    legend.columnMaximum = 1
+    legend.fontName = 'Helvetica'
+    legend.fontSize = 7
+    legend.dx = legend.dy = 6
+    legend.deltax = 120
+    legend.colorNamePairs = [
+        (_FARVER['blå'], f"Total {p1}"),
+        (_FARVER['lyseblå'], f"Total {p2}"),
+        (_FARVER['rød'], f"{spec['procent_navn']} {p1}"),
+        (_FARVER['orange'], f"{spec['procent_navn']} {p2}"),
+    ]
+    drawing.add(legend)
+
+    _title(drawing, spec['titel'])
+    _y_title(drawing, spec['antal_titel'][1], 15)
+    _y_title(drawing, spec['procent_titel'], GRAF_BREDDE - 20)
+    return drawing
+
+
+# Funktion til at tegne standardgraferne (én pr. side) ud fra chart_aggregates().
+# Siderne tegnes først, når rapporten skriver dem.
+def vector_pages(kind, aggregates, bar_labels, line_labels, start_years, specs=GRAFER):
+    for spec, (total, highlighted) in zip(specs, aggregates):
+        if kind == 'søjler':
+            yield bar_drawing(spec, total, highlighted, bar_labels)
+        else:
+            yield line_drawing(spec, total, highlighted, line_labels, start_years)
+
+
+# Titel og periodelinjer til rapportens første side
+def report_header(chart_type, start_date_p1, end_date_p1, start_date_p2, end_date_p2):
+    return (
+        f"Ydelsesanalyse - Periodesammenligning ({chart_type})",
+        [f"Periode 1: {start_date_p1.strftime('%b %Y')} - {end_date_p1.strftime('%b %Y')}",
+         f"Periode 2: {start_date_p2.strftime('%b %Y')} - {end_date_p2.strftime('%b %Y')}"],
+    )
+
+
+# Funktion til at finde renderingsindstillinger for en kvalitetsprofil. Billedet tegnes
+# med bevaret format i GRAF_BREDDE x GRAF_HØJDE punkter (1/72 tomme), og scale sættes,
+# så billedet har profilens DPI i den størrelse.
+def render_options(profile=STANDARD_KVALITET):
+    quality = KVALITETER[profile]
+    drawn_width = min(GRAF_BREDDE, GRAF_HØJDE * BILLED_BREDDE / BILLED_HØJDE)
+    return {
+        'format': quality['format'],
+        'width': BILLED_BREDDE,
+        'height': BILLED_HØJDE,
+        'scale': drawn_width / 72 * quality['dpi'] / BILLED_BREDDE,
+        'quality': quality.get('jpeg_kvalitet'),
+    }
+
+
+# Funktion til at skrive rapporten til en binær fil. pages er én graf pr. side - en
+# tegning, et færdigt billede (bytes) eller stien til en billedfil - og kan være en
+# generator, så hver side først laves, når den skal tegnes, og slippes bagefter.
+# header er (titel, linjer) til første side.
+def write_report(pages, header, out):
+    c = canvas.Canvas(out, pagesize=landscape(A4))
+    width, height = landscape(A4)
+
+    title, lines = header
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(50, height - 50, title)
+    c.setFont("Helvetica", 12)
+    for i, line in enumerate(lines):
+        c.drawString(50, height - 80 - 20 * i, line)
+
+    # Hvert billede lægges i PDF'en én gang som en form og genbruges på alle sider, hvor
+    # samme billede (samme bytes) forekommer
+    forms = {}
+    for page, graph in enumerate(pages):
+        if page > 0:
+            c.showPage()
+        y = height - (400 if page == 0 else 350)
+        if isinstance(graph, Drawing):
+            renderPDF.draw(graph, c, 50, y)
+            continue
+
+        data = graph if isinstance(graph, bytes) else Path(graph).read_bytes()
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        if digest not in forms:
+            forms[digest] = f"billede{len(forms)}"
+            c.beginForm(forms[digest])
+            c.drawImage(ImageReader(io.BytesIO(data)), 0, 0, width=GRAF_BREDDE, height=GRAF_HØJDE,
+                        preserveAspectRatio=True)
+            c.endForm()
+        c.saveState()
+        c.translate(50, y)
+        c.doForm(forms[digest])
+        c.restoreState()
+
+    c.save()
+
+
+# Funktion til at lave hele rapporten i hukommelsen. Returnerer PDF'en som bytes.
+def build_report(pages, header):
+    buffer = io.BytesIO()
+    write_report(pages, header, buffer)
+    return buffer.getvalue()
@@ -0,0 +1,80 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+# Diskcache til færdige rapporter og renderede grafbilleder. Hver post er én fil
+# navngivet efter sin nøgle; ændringstiden opdateres ved hvert hit, og når
+# mappen fylder mere end loftet, slettes de længst ubrugte filer først (LRU).
+# Filerne skrives atomisk, så flere sessioner og processer kan dele mappen.
+
+CACHE_MAKS_MB = int(os.environ.get("YDELSER_RAPPORTCACHE_MB", "200"))
+
+
+# Funktion til at finde cachemappen: YDELSER_RAPPORTCACHE, ellers ved siden af
+# kolonnelageret, ellers i systemets midlertidige mappe
+def report_cache_dir(store_root=None):
+    cache_dir = os.environ.get("YDELSER_RAPPORTCACHE")
+    if cache_dir:
+        cache_dir = Path(cache_dir)
+    elif store_root:
+        cache_dir = Path(store_root) / '.rapportcache'
+    else:
+        cache_dir = Path(tempfile.gettempdir()) / 'ydelser-rapportcache'
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+
+def _path(cache_dir, key, suffix):
+    return Path(cache_dir) / f"{key}{suffix}"
+
+
+# Funktion til at finde en post som fil (None ved miss). Et hit markerer posten som brugt.
+def cache_file(cache_dir, key, suffix):
+    path = _path(cache_dir, key, suffix)
+    try:
+        os.utime(path)
+    except OSError:
+        return None
+    return path
+
+
+# Funktion til at skrive en post direkte til disk: giver en åben midlertidig fil i
+# cachemappen, som først bliver til posten, når blokken afsluttes uden fejl.
+@contextmanager
+def cache_writer(cache_dir, key, suffix, max_bytes=CACHE_MAKS_MB * 1024 * 1024):
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+        os.replace(tmp_path, _path(cache_dir, key, suffix))
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+    evict(cache_dir, max_bytes)
+
+
+# Funktion til at gemme en post og derefter holde mappen under loftet
+def cache_put(cache_dir, key, suffix, data, max_bytes=CACHE_MAKS_MB * 1024 * 1024):
+    with cache_writer(cache_dir, key, suffix, max_bytes) as f:
+        f.write(data)
+
+
+# Funktion til at slette de længst ubrugte poster, indtil mappen er under max_bytes
+def evict(cache_dir, max_bytes):
+    entries = []
+    for path in Path(cache_dir).iterdir():
+        if path.name.startswith('.tmp-'):
+            continue
+        try:
+            stat = path.stat()
+        except OSError:
+            continue  # slettet af en anden proces imens
+        entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+    used = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+        if used <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        used -= size
@@ -0,0 +1,110 @@
+import itertools
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+
+# Baggrundskø til PDF-rapporter: rapporterne laves af et fast antal tråde, så
+# mange samtidige klik ikke starter lige så mange renderinger. Køen har en øvre
+# grænse - er den fuld, afvises nye jobs (backpressure), og brugeren må prøve
+# igen. Hvert job er en dict med status og fremdrift, som UI'et poller.
+# Samme rapport (samme job-id) bestilt af flere sessioner laves kun én gang.
+
+RAPPORT_TRÅDE = int(os.environ.get("YDELSER_RAPPORT_TRÅDE", "2"))
+RAPPORT_KØ = int(os.environ.get("YDELSER_RAPPORT_KØ", "8"))
+
+# Antal afsluttede jobs der huskes, så andre sessioner kan hente resultatet
+_GEMTE_JOBS = 32
+
+
+# Funktion til at starte køen og dens arbejdstråde
+def start_report_queue(workers=RAPPORT_TRÅDE, max_queued=RAPPORT_KØ):
+    report_queue = {
+        'kø': queue.Queue(maxsize=max_queued),
+        'jobs': {},
+        'lås': threading.Lock(),
+        'tæller': itertools.count(),
+    }
+    for i in range(workers):
+        threading.Thread(target=_worker, args=(report_queue,), name=f"rapport-{i}", daemon=True).start()
+    return report_queue
+
+
+def _worker(report_queue):
+    while True:
+        job, work = report_queue['kø'].get()
+        job['status'] = 'kører'
+        job['startet'] = time.time()
+
+        def progress(fraction, text=None, **details):
+            job['fremdrift'] = fraction
+            if text:
+                job['trin'] = text
+            job['detaljer'].update(details)
+
+        try:
+            job['resultat'] = work(progress)
+            job['status'] = 'færdig'
+        except Exception as e:
+            job['fejl'] = e
+            job['status'] = 'fejl'
+        job['fremdrift'] = 1.0
+        job['afsluttet'] = time.time()
+        report_queue['kø'].task_done()
+
+
+# Et eksisterende job genbruges, mens det er i kø eller kører, og når det er færdigt,
+# så længe resultatfilen findes - rapportcachen kan have slettet den siden
+def _reusable(job):
+    if job['status'] == 'færdig':
+        return job['resultat'] is not None and Path(job['resultat']).exists()
+    return job['status'] != 'fejl'
+
+
+# Funktion til at lægge et job i køen. work(progress) laver rapporten, kaldes med en
+# funktion progress(andel, tekst, **detaljer) og returnerer stien til resultatfilen.
+# Detaljerne (fx renderingstider) gemmes i jobbets 'detaljer'. Returnerer
+# job-dict'en - en eksisterende, hvis samme job allerede er i kø, kører eller er
+# færdigt - eller None, hvis køen er fuld.
+def submit_report(report_queue, job_id, work):
+    with report_queue['lås']:
+        job = report_queue['jobs'].get(job_id)
+        if job is not None and _reusable(job):
+            return job
+
+        job = {
+            'id': job_id,
+            'nummer': next(report_queue['tæller']),
+            'status': 'i kø',
+            'fremdrift': 0.0,
+            'trin': "Venter i kø",
+            'resultat': None,
+            'fejl': None,
+            'detaljer': {},
+            'oprettet': time.time(),
+        }
+        try:
+            report_queue['kø'].put_nowait((job, work))
+        except queue.Full:
+            return None
+        report_queue['jobs'][job_id] = job
+        _forget_finished(report_queue['jobs'])
+    return job
+
+
+# Ældste afsluttede jobs glemmes - resultatet ligger også i rapportcachen
+def _forget_finished(jobs):
+    finished = [job for job in jobs.values() if job['status'] in ('færdig', 'fejl')]
+    for job in sorted(finished, key=lambda job: job['nummer'])[:-_GEMTE_JOBS]:
+        del jobs[job['id']]
+
+
+# Antal jobs foran et job i køen (0 når det kører eller er afsluttet)
+def queue_position(report_queue, job):
+    if job['status'] != 'i kø':
+        return 0
+    with report_queue['lås']:
+        return sum(1 for other in report_queue['jobs'].values()
+                   if other['status'] == 'i kø' and other['nummer'] < job['nummer'])
+
@@ -0,0 +1,103 @@
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import plotly.io as pio
+from PIL import Image
+
+# Rendering af grafer til billeder (PDF-rapporten) i en pulje af varme
+# arbejdsprocesser. Hver proces starter Kaleido/Chromium én gang ved opstart og
+# genbruger den, så de enkelte grafer ikke betaler opstarten, og rapportens
+# grafer renderes samtidig i hver sin proces.
+
+RENDER_ARBEJDERE = int(os.environ.get("YDELSER_RENDER_ARBEJDERE", "3"))
+
+# Lille figur der renderes ved opstart, så browseren er varm før første rapport
+_OPVARMNING = {'data': [{'type': 'bar', 'y': [1]}], 'layout': {}}
+
+
+# Funktion til at gøre en proces klar til at rendere (kaldes én gang pr. arbejdsproces)
+def start_renderer():
+    # Kaleido >= 1.1 kan holde én browser kørende til alle synkrone kald i processen
+    try:
+        import kaleido
+    except ImportError:
+        return
+    if hasattr(kaleido, 'start_sync_server'):
+        kaleido.start_sync_server()
+
+
+def _render(figure_json, format, width, height, scale, quality=None):
+    t0 = time.perf_counter()
+    if format == 'jpeg':
+        # Kaleido kan ikke styre JPEG-kvaliteten, så der renderes PNG, som komprimeres her
+        png = pio.to_image(json.loads(figure_json), format='png', width=width, height=height,
+                           scale=scale, validate=False)
+        buffer = io.BytesIO()
+        Image.open(io.BytesIO(png)).convert('RGB').save(buffer, 'JPEG', quality=quality or 85, optimize=True)
+        image = buffer.getvalue()
+    else:
+        image = pio.to_image(json.loads(figure_json), format=format, width=width, height=height,
+                             scale=scale, validate=False)
+    return image, time.perf_counter() - t0
+
+
+# Streamlit-serveren kører tråde, som ikke må forkes, så processerne startes fra
+# en forkserver, der kun har importeret dette modul
+def _context():
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+# Funktion til at starte puljen. Opvarmningen kører i baggrunden, medmindre wait=True.
+def start_render_pool(workers=RENDER_ARBEJDERE, wait=False):
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=_context(), initializer=start_renderer)
+
+    # Streamlit kører app-scriptet som __main__, og nye processer ville køre det igen.
+    # Mens processerne startes (én pr. opvarmningsjob), er __main__ dette modul.
+    app_main = sys.modules['__main__']
+    sys.modules['__main__'] = sys.modules[__name__]
+    try:
+        warmup = [pool.submit(_render, json.dumps(_OPVARMNING), 'png', 50, 50, 1) for _ in range(workers)]
+    finally:
+        sys.modules['__main__'] = app_main
+    if wait:
+        for future in warmup:
+            future.result()
+    return pool
+
+
+# Funktion til at rendere figurer løbende: giver (billede, sekunder) i figurernes
+# rækkefølge, med højst `ahead` figurer under rendering eller færdige og uafhentede
+# ad gangen. figures kan være en generator, så lange rapporter ikke har alle
+# figurer og billeder i hukommelsen på én gang.
+def iter_rendered(figures, pool=None, format='png', width=1200, height=500, scale=1, quality=None,
+                  ahead=2 * RENDER_ARBEJDERE):
+    jobs = ((fig.to_json(validate=False), format, width, height, scale, quality) for fig in figures)
+    if pool is None:
+        for job in jobs:
+            yield _render(*job)
+        return
+
+    pending = deque()
+    for job in jobs:
+        pending.append(pool.submit(_render, *job))
+        if len(pending) >= max(ahead, 1):
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+# Funktion til at rendere flere figurer samtidig. Returnerer [(billede, sekunder), ...]
+# i samme rækkefølge som figurerne. Uden pulje renderes de én ad gangen i processen.
+def render_figures(figures, pool=None, format='png', width=1200, height=500, scale=1, quality=None):
+    figures = list(figures)
+    return list(iter_rendered(figures, pool, format, width, height, scale, quality, ahead=len(figures)))
@@ -0,0 +1,56 @@
+import numpy as np
+
+# Sæsonmønster: antal ydelser pr. (ugedag, ISO-uge). Ugedag og ISO-uge beregnes
+# én gang for hver dag i den daglige (kode x dag) matrix, og alle grupper og
+# perioder tælles op med ét np.bincount over et samlet indeks.
+
+UGEDAGE = ['Man', 'Tir', 'Ons', 'Tor', 'Fre', 'Lør', 'Søn']
+UGER = 53
+
+
+# Ugedag (0 = mandag) og ISO-uge (1..53) for dage siden 1970-01-01
+def weekday_iso_week(days):
+    days = np.asarray(days, dtype=np.int64)
+    weekday = (days + 3) % 7  # 1970-01-01 var en torsdag
+
+    # ISO-ugen er den uge, som ugens torsdag ligger i
+    thursday = (days - weekday + 3).astype('datetime64[D]')
+    iso_year_start = thursday.astype('datetime64[Y]').astype('datetime64[D]')
+    week = (thursday - iso_year_start).astype(np.int64) // 7 + 1
+
+    return weekday, week
+
+
+# Dagsserier pr. gruppe: medlemsmatrix (grupper x koder) ganget på (koder x dage)
+def group_daily(codes, matrix, groups):
+    membership = np.array([np.isin(codes, group) for group in groups], dtype=np.float64).reshape(len(groups), len(codes))
+    return membership @ matrix if matrix.shape[1] else np.zeros((len(groups), 0))
+
+
+# Funktion til at tælle (gruppe, periode, ugedag, uge) i ét gennemløb.
+# groups er lister af koder, periods er (første dag, sidste dag) i dage siden 1970-01-01.
+def season_matrix(codes, first_day, matrix, groups, periods):
+    n_groups, n_periods = len(groups), len(periods)
+    n_days = matrix.shape[1]
+
+    daily = group_daily(codes, matrix, groups)
+
+    days = first_day + np.arange(n_days)
+    weekday, week = weekday_iso_week(days)
+    cell = weekday * UGER + (week - 1)
+
+    index_parts = []
+    weight_parts = []
+    for p, (start_day, end_day) in enumerate(periods):
+        in_period = (days >= start_day) & (days <= end_day)
+        for g in range(n_groups):
+            index_parts.append((g * n_periods + p) * 7 * UGER + cell[in_period])
+            weight_parts.append(daily[g, in_period])
+
+    counts = np.bincount(
+        np.concatenate(index_parts).astype(np.int64),
+        weights=np.concatenate(weight_parts),
+        minlength=n_groups * n_periods * 7 * UGER,
+    )
+
+    return counts.reshape(n_groups, n_periods, 7, UGER)
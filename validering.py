@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Validering af en eksport: alle regler beregnes som kolonne-masker i ét gennemløb.
+# Ugyldige rækker flyttes til en karantænetabel med årsag(er) i stedet for at
+# forsvinde stille eller få scriptet til at fejle.
+
+REQUIRED_COLUMNS = ['Ydelseskode', 'Antal', 'Ydelses dato', 'Bruger']
+
+ÅRSAG_KOLONNE = 'Årsag'
+
+# Regler i den rækkefølge de vises i opsummeringen
+RULES = [
+    'Antal mangler',
+    'Antal under 1',
+    'Ydelseskode mangler/ugyldig',
+    'Dato mangler/ugyldig',
+    'Bruger mangler',
+    'Ukendt bruger',
+]
+
+# Kendte brugere (valgfri) - fx YDELSER_BRUGERE="mp,jn,jes,ah,cj,in,ab"
+KNOWN_USERS = [u.strip() for u in os.environ.get("YDELSER_BRUGERE", "").split(",") if u.strip()]
+
+
+# Funktion til at validere rå data - returnerer gyldige rækker og karantæne
+def validate(raw, dates, known_users=None):
+    missing = [col for col in REQUIRED_COLUMNS if col not in raw.columns]
+    if missing:
+        raise ValueError(f"Eksporten mangler kolonner: {', '.join(missing)}")
+
+    known_users = KNOWN_USERS if known_users is None else known_users
+
+    antal = pd.to_numeric(raw['Antal'], errors='coerce').to_numpy(dtype='float64')
+    codes = pd.to_numeric(raw['Ydelseskode'], errors='coerce').to_numpy(dtype='float64')
+    users = raw['Bruger']
+    user_missing = (users.isna() | (users.astype(str).str.strip() == '')).to_numpy()
+
+    masks = np.vstack([
+        np.isnan(antal),
+        antal < 1,
+        ~np.isfinite(codes) | (codes != np.round(codes)),
+        np.isnat(np.asarray(dates, dtype='datetime64[ns]')),
+        user_missing,
+        ~user_missing & ~users.isin(known_users).to_numpy() if known_users else np.zeros(len(raw), dtype=bool),
+    ])
+
+    invalid = masks.any(axis=0)
+
+    # Hver kombination af regler får ét bitmønster - årsagsteksten laves kun én gang pr. mønster
+    bad = masks[:, invalid]
+    patterns = (bad.astype(np.int64) << np.arange(len(RULES))[:, None]).sum(axis=0)
+    uniq, inverse = np.unique(patterns, return_inverse=True)
+    texts = np.array(['; '.join(rule for i, rule in enumerate(RULES) if p >> i & 1) for p in uniq], dtype=object)
+
+    quarantine = raw[invalid].copy()
+    quarantine[ÅRSAG_KOLONNE] = texts[inverse] if len(uniq) else []
+
+    valid = raw[~invalid].copy()
+    valid['Ydelses dato'] = np.asarray(dates, dtype='datetime64[ns]')[~invalid]
+    valid['Ydelseskode'] = codes[~invalid].astype('int64')
+
+    return valid, quarantine
+
+
+# Funktion til at tælle rækker pr. regel (en række kan ramme flere regler)
+def summarize_quarantine(quarantine):
+    reasons = quarantine[ÅRSAG_KOLONNE].astype(str) if len(quarantine) else pd.Series([], dtype=str)
+    counts = [int(reasons.str.contains(rule, regex=False).sum()) for rule in RULES]
+    summary = pd.DataFrame({'Regel': RULES, 'Rækker': counts})
+    return summary[summary['Rækker'] > 0].reset_index(drop=True)